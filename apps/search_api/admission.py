@@ -0,0 +1,152 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'admission_in_flight',
+    'Requests currently holding an admission slot',
+    ['name']
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'admission_queue_depth',
+    'Requests waiting for an admission slot',
+    ['name']
+)
+
+ADMISSION_SHED = Counter(
+    'admission_shed_total',
+    'Requests rejected by admission control, by reason',
+    ['name', 'reason']
+)
+
+ADMISSION_WAIT = Histogram(
+    'admission_wait_seconds',
+    'Time admitted requests spent waiting for a slot',
+    ['name'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Monotonic deadline of the request being served, if it has one
+request_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def remaining_budget() -> float | None:
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline():
+    """Raise asyncio.TimeoutError once the request's deadline has passed.
+
+    Called between stages, so work whose caller has already been answered
+    with a timeout stops instead of running on outside its admission slot.
+    """
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise asyncio.TimeoutError("Request deadline exceeded")
+
+
+def remaining_timeout(default: int | None = None) -> int | None:
+    """Remaining budget as whole seconds, the unit Qdrant's timeout takes."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return default
+    return max(1, math.ceil(remaining))
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request shed: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded FIFO wait queue.
+
+    A request that finds the queue full, or is still queued when its
+    deadline passes, raises Overloaded instead of waiting indefinitely.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def _shed(self, reason: str):
+        ADMISSION_SHED.labels(name=self.name, reason=reason).inc()
+        raise Overloaded(reason, self.retry_after)
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.labels(name=self.name).set(self._in_flight)
+        ADMISSION_QUEUE_DEPTH.labels(name=self.name).set(len(self._waiters))
+
+    def _release(self):
+        # Hand the slot straight to the oldest live waiter, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    async def _acquire(self, deadline: float):
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._shed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            self._shed("deadline")
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        ADMISSION_WAIT.labels(name=self.name).observe(time.monotonic() - start_time)
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def admit(self, deadline: float):
+        await self._acquire(deadline)
+        token = request_deadline.set(deadline)
+        try:
+            yield
+        finally:
+            request_deadline.reset(token)
+            self._release()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+
+MANIFEST_FILE = "manifest.json"
+TOKENIZER_NAME = "Cohere/multilingual-22-12"
+
+# Files that must be present for the service to start without the Hub
+REQUIRED_FILES = (
+    MANIFEST_FILE,
+    os.path.join("model", "config.json"),
+    os.path.join("model", "modules.json"),
+    os.path.join("tokenizer", "tokenizer.json"),
+)
+
+
+class Artifacts:
+    """A versioned, self-contained directory of everything the service loads.
+
+        <ARTIFACT_DIR>/
+            manifest.json
+            model/           sentence-transformers model (copy of ./ml_model)
+            tokenizer/       fast tokenizer for BM25, tokenizer.json
+            onnx/            optional `python onnx_encoder.py export` output
+    """
+
+    def __init__(self, path: str):
+        missing = [name for name in REQUIRED_FILES if not os.path.exists(os.path.join(path, name))]
+        if missing:
+            raise FileNotFoundError(
+                f"Artifact directory {path} is incomplete, missing: {', '.join(missing)}. "
+                f"Build it with `python artifacts.py build`."
+            )
+
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+            self.manifest = json.load(f)
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.path, "model")
+
+    @property
+    def tokenizer_path(self) -> str:
+        return os.path.join(self.path, "tokenizer")
+
+    @property
+    def onnx_path(self) -> str:
+        path = os.path.join(self.path, "onnx")
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Artifact directory {self.path} has no ONNX export")
+        return path
+
+
+def build(out_root: str, version: str, model_dir: str, onnx_dir: str | None = None) -> str:
+    """Assemble `<out_root>/<version>`; this is the only step that needs network."""
+    from transformers import AutoTokenizer
+
+    path = os.path.join(out_root, version)
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists, artifact versions are immutable")
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    shutil.copytree(model_dir, os.path.join(tmp_path, "model"))
+    tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME, use_fast=True)
+    tokenizer.save_pretrained(os.path.join(tmp_path, "tokenizer"))
+    if onnx_dir:
+        shutil.copytree(onnx_dir, os.path.join(tmp_path, "onnx"))
+
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "version": version,
+            "created_at": time.time(),
+            "model_source": os.path.abspath(model_dir),
+            "tokenizer_source": TOKENIZER_NAME,
+            "onnx": bool(onnx_dir),
+        }, f, indent=2)
+
+    os.replace(tmp_path, path)
+    Artifacts(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an offline artifact directory for the search service")
+    parser.add_argument("version")
+    parser.add_argument("--out", default="./artifacts")
+    parser.add_argument("--model", default="./ml_model")
+    parser.add_argument("--onnx", default=None, help="Directory written by `python onnx_encoder.py export`")
+    args = parser.parse_args()
+
+    print(f"Wrote {build(args.out, args.version, args.model, args.onnx)}")
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+from prometheus_client import Histogram
+
+
+ENCODE_BATCH_SIZE = Histogram(
+    'encode_batch_size',
+    'Number of queries coalesced into a single encode call',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+ENCODE_QUEUE_WAIT = Histogram(
+    'encode_queue_wait_seconds',
+    'Time a query spent waiting for its encode batch to be dispatched',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+
+class EncodeBatcher:
+    """Coalesces concurrent single-query encode calls into one batched call.
+
+    Queries are collected until `max_batch_size` is reached or `max_wait_ms`
+    has elapsed since the first query of the batch was picked up. A lone
+    query arriving after an idle period is dispatched immediately, so the
+    wait window is only paid once concurrent traffic has been observed.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], Any],
+        executor: Executor,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 2.0,
+    ):
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._last_batch_size = 1
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def encode(self, text: str):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list[tuple]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            # Idle service: don't make a single query wait for company
+            if len(batch) == 1 and self._last_batch_size == 1:
+                break
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self._last_batch_size = len(batch)
+            # Callers that gave up (deadline, budget, disconnect) while
+            # queued cancelled their futures; don't spend an encode on them
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            dispatched = time.perf_counter()
+            ENCODE_BATCH_SIZE.observe(len(batch))
+            for _, _, enqueued in batch:
+                ENCODE_QUEUE_WAIT.observe(dispatched - enqueued)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                # The caller may have been cancelled while the batch ran
+                if not future.done():
+                    future.set_result(embedding)
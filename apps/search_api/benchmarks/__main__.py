@@ -0,0 +1,37 @@
+"""Run the offline benchmark suite, one process per benchmark.
+
+Each benchmark writes its own JSON file to benchmarks/results/. Run from
+apps/search_api:
+
+    python -m benchmarks
+    python -m benchmarks bm25 search
+"""
+import subprocess
+import sys
+
+
+# Benchmarks that need nothing beyond the local model files
+SUITE = {
+    "bm25": [],
+    "encoder": ["--backends", "torch_fp32", "--batch-sizes", "1", "8", "32", "128"],
+    "search": [],
+    "dense_index": [],
+    "blob_store": [],
+    "pruning": ["--min-idf", "1.0"],
+}
+
+
+def main():
+    names = sys.argv[1:] or list(SUITE)
+    failed = []
+    for name in names:
+        print(f"== {name}", flush=True)
+        command = [sys.executable, "-m", f"benchmarks.bench_{name}", *SUITE.get(name, [])]
+        if subprocess.run(command).returncode != 0:
+            failed.append(name)
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
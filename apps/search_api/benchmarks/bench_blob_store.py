@@ -0,0 +1,75 @@
+"""Compare response assembly from Qdrant payload dicts with the blob store.
+
+Run from apps/search_api:
+
+    python -m benchmarks.bench_blob_store --products 5000 --limit 20
+"""
+import argparse
+import random
+import tempfile
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from blob_store import BlobStore, build
+from planner import parse_fields
+from benchmarks.common import measure, save_results, synthetic_payload
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--fields", default=None, help="Projection to benchmark, '*' for full payloads")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    fields = parse_fields(args.fields)
+    payloads = [synthetic_payload(i, rng) for i in range(args.products)]
+
+    client = QdrantClient(":memory:")
+    client.create_collection("bench", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("bench", points=[
+        PointStruct(id=i, vector=[rng.random() for _ in range(4)], payload=payload)
+        for i, payload in enumerate(payloads)
+    ])
+
+    with tempfile.TemporaryDirectory() as path:
+        build(client, "bench", path, fields)
+        store = BlobStore(path)
+
+        ids = rng.sample(range(args.products), args.limit)
+        if fields is None:
+            projected = [payloads[i] for i in ids]
+        else:
+            projected = [{k: payloads[i][k] for k in fields if k in payloads[i]} for i in ids]
+
+        # What FastAPI does with the list returned by search_product
+        def dict_path():
+            return JSONResponse(content=jsonable_encoder(projected)).body
+
+        def blob_path():
+            return store.render(ids)
+
+        results = {
+            "products": args.products,
+            "limit": args.limit,
+            "fields": list(fields) if fields is not None else "*",
+            "response_bytes": len(blob_path()),
+            "dict_path": measure(dict_path, repeat=args.repeat),
+            "blob_path": measure(blob_path, repeat=args.repeat),
+        }
+        store.close()
+
+    results["speedup_p50"] = results["dict_path"]["p50_ms"] / results["blob_path"]["p50_ms"]
+    for name in ("dict_path", "blob_path"):
+        print(f"{name:10s} p50={results[name]['p50_ms']:.4f}ms p99={results[name]['p99_ms']:.4f}ms")
+    print(f"speedup (p50): {results['speedup_p50']:.1f}x, response {results['response_bytes']} bytes")
+    print(f"saved to {save_results('blob_store', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Time the BM25 encoder stage by stage on a Bengali + English corpus.
+
+Also compares per-document raw_embed with the vectorized raw_embed_batch
+used for indexing, and checks that the two agree bit for bit.
+
+Runs fully offline once the tokenizer is cached (or with --tokenizer
+pointing at an artifact's tokenizer directory). Run from apps/search_api:
+
+    python -m benchmarks.bench_bm25
+"""
+import argparse
+import itertools
+import os
+import random
+
+from bm25 import BM25
+from benchmarks.common import SAMPLE_QUERIES, measure, save_results, synthetic_title
+
+
+def corpus(size: int, rng: random.Random) -> list[str]:
+    return SAMPLE_QUERIES + [synthetic_title(rng) for _ in range(size - len(SAMPLE_QUERIES))]
+
+
+def bit_exact(bm25: BM25, documents: list[str]) -> bool:
+    """Whether raw_embed_batch reproduces raw_embed exactly, order included."""
+    offsets, indices, values = bm25.raw_embed_batch(documents, batch_size=97)
+    for i, expected in enumerate(bm25.raw_embed(documents)):
+        start, end = offsets[i], offsets[i + 1]
+        if indices[start:end].tolist() != expected["indices"] or values[start:end].tolist() != expected["values"]:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokenizer", default=None, help="Directory holding tokenizer.json")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    bm25 = BM25(
+        stopwords_dir=os.path.abspath("./stopwards"),
+        languages=["english", "bengali"],
+        tokenizer_path=args.tokenizer,
+    )
+    documents = corpus(args.documents, random.Random(42))
+    cleaned = [bm25._clean_text(document) for document in documents]
+
+    # Per-call stages cycle through the corpus, so each sample sees a
+    # different document
+    def cycling(fn, items):
+        items = itertools.cycle(items)
+        return lambda: fn(next(items))
+
+    results = {
+        "documents": len(documents),
+        "clean_text": measure(cycling(bm25._clean_text, documents), repeat=args.repeat),
+        "term_frequency": measure(cycling(bm25._term_frequency, cleaned), repeat=args.repeat),
+        "raw_embed": {},
+        "raw_embed_batch": {},
+        "batch_bit_exact": bit_exact(bm25, documents),
+    }
+    for batch_size in args.batch_sizes:
+        batch = (documents * (batch_size // len(documents) + 1))[:batch_size]
+        for name, fn in (("raw_embed", bm25.raw_embed), ("raw_embed_batch", bm25.raw_embed_batch)):
+            latency = measure(lambda: fn(batch), repeat=max(1, args.repeat // 4), warmup=3)
+            latency["documents_per_second"] = batch_size / (latency["mean_ms"] / 1000)
+            results[name][str(batch_size)] = latency
+
+    for stage in ("clean_text", "term_frequency"):
+        print(f"{stage:15s} p50={results[stage]['p50_ms'] * 1000:.1f}us p99={results[stage]['p99_ms'] * 1000:.1f}us")
+    for name in ("raw_embed", "raw_embed_batch"):
+        for batch_size, stats in results[name].items():
+            print(f"{name:15s} batch={batch_size:>4s} p50={stats['p50_ms']:.2f}ms "
+                  f"docs/s={stats['documents_per_second']:.0f}")
+    print(f"raw_embed_batch bit-exact: {results['batch_bit_exact']}")
+    print(f"saved to {save_results('bm25', results)}")
+
+
+if __name__ == "__main__":
+    main()
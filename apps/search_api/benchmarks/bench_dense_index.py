@@ -0,0 +1,113 @@
+"""Compare the embedded float16 dense index with a Qdrant dense query.
+
+Seeds a throwaway collection with random unit vectors, snapshots it and
+times top-k queries through both paths. Run from apps/search_api:
+
+    python -m benchmarks.bench_dense_index --qdrant-url http://localhost:6333
+
+Without --qdrant-url, Qdrant's local in-memory mode is used. That is a
+pure Python brute force, so only the embedded numbers are representative.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from dense_index import DenseIndex, snapshot
+from benchmarks.common import measure, measure_async, save_results, synthetic_payload
+
+
+COLLECTION = "bench_dense_index"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    np_rng = np.random.default_rng(42)
+    vectors = np_rng.standard_normal((args.products, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    if args.qdrant_url:
+        client = QdrantClient(url=args.qdrant_url, timeout=600)
+        async_client = AsyncQdrantClient(url=args.qdrant_url, timeout=600)
+    else:
+        client = QdrantClient(":memory:")
+        async_client = None
+
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        COLLECTION,
+        vectors_config={"dense_vector": VectorParams(size=args.dim, distance=Distance.COSINE)},
+    )
+    for start in range(0, args.products, 1000):
+        client.upsert(COLLECTION, points=[
+            PointStruct(id=i, vector={"dense_vector": vectors[i].tolist()}, payload=synthetic_payload(i, rng))
+            for i in range(start, min(start + 1000, args.products))
+        ])
+
+    queries = np_rng.standard_normal((args.repeat, args.dim), dtype=np.float32)
+    cursor = iter(range(10 ** 9))
+
+    def next_query():
+        return queries[next(cursor) % len(queries)]
+
+    with tempfile.TemporaryDirectory() as path:
+        snapshot(client, COLLECTION, path)
+        index = DenseIndex(path)
+
+        results = {
+            "products": args.products,
+            "dim": args.dim,
+            "limit": args.limit,
+            "qdrant": args.qdrant_url or ":memory:",
+            "index_bytes": index.nbytes,
+            "embedded": measure(lambda: index.search(next_query(), args.limit), repeat=args.repeat),
+        }
+
+        # Recall of the float16 snapshot against exact float32 scores
+        recall = []
+        for query in queries[:50]:
+            exact = set(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:args.limit].tolist())
+            found = {point.id for point in index.search(query, args.limit)}
+            recall.append(len(exact & found) / args.limit)
+        results["embedded_recall"] = sum(recall) / len(recall)
+
+    if async_client is not None:
+        async def qdrant_query():
+            await async_client.query_points(
+                COLLECTION, query=next_query().tolist(), using="dense_vector",
+                with_payload=True, limit=args.limit,
+            )
+        results["qdrant_rest"] = asyncio.run(measure_async(qdrant_query, repeat=args.repeat))
+    else:
+        results["qdrant_local"] = measure(
+            lambda: client.query_points(
+                COLLECTION, query=next_query().tolist(), using="dense_vector",
+                with_payload=True, limit=args.limit,
+            ),
+            repeat=min(args.repeat, 20),
+        )
+
+    client.delete_collection(COLLECTION)
+
+    for name, value in results.items():
+        if isinstance(value, dict):
+            print(f"{name:12s} p50={value['p50_ms']:.3f}ms p99={value['p99_ms']:.3f}ms")
+    print(f"embedded recall@{args.limit}: {results['embedded_recall']:.4f}")
+    print(f"saved to {save_results('dense_index', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare the fp32 PyTorch query encoder with the ONNX Runtime backend.
+
+Export the ONNX model first with `python onnx_encoder.py export`, then run
+from apps/search_api:
+
+    python -m benchmarks.bench_encoder --batch-sizes 1 8 32
+
+`--backends torch_fp32` times model.encode alone, with no ONNX export.
+"""
+import argparse
+import os
+import time
+
+from sentence_transformers import SentenceTransformer
+
+from onnx_encoder import OnnxEncoder, parity
+from benchmarks.common import SAMPLE_QUERIES, measure, save_results
+
+
+def bench_backend(encoder, batch_sizes: list[int], repeat: int) -> dict:
+    results = {}
+    for batch_size in batch_sizes:
+        batch = (SAMPLE_QUERIES * (batch_size // len(SAMPLE_QUERIES) + 1))[:batch_size]
+        latency = measure(lambda: encoder.encode(batch), repeat=repeat, warmup=3)
+        latency["queries_per_second"] = batch_size / (latency["mean_ms"] / 1000)
+        results[str(batch_size)] = latency
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="./ml_model")
+    parser.add_argument("--onnx", default=os.environ.get("ONNX_MODEL_PATH", "./ml_model_onnx"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--backends", nargs="+", default=["torch_fp32", "onnx_fp32", "onnx_int8"],
+        choices=["torch_fp32", "onnx_fp32", "onnx_int8"],
+    )
+    args = parser.parse_args()
+
+    backends = {}
+    start_time = time.perf_counter()
+    backends["torch_fp32"] = SentenceTransformer(args.model)
+    load_times = {"torch_fp32": time.perf_counter() - start_time}
+    for name, int8 in (("onnx_fp32", False), ("onnx_int8", True)):
+        if name not in args.backends:
+            continue
+        start_time = time.perf_counter()
+        backends[name] = OnnxEncoder(args.onnx, int8=int8)
+        load_times[name] = time.perf_counter() - start_time
+
+    results = {"load_seconds": load_times, "parity": {}, "latency": {}}
+    for name, encoder in backends.items():
+        if name == "torch_fp32" and name not in args.backends:
+            continue
+        if name != "torch_fp32":
+            results["parity"][name] = parity(backends["torch_fp32"], encoder, SAMPLE_QUERIES)
+        results["latency"][name] = bench_backend(encoder, args.batch_sizes, args.repeat)
+
+    for name, latency in results["latency"].items():
+        for batch_size, stats in latency.items():
+            print(f"{name:10s} batch={batch_size:>3s} p50={stats['p50_ms']:.2f}ms "
+                  f"qps={stats['queries_per_second']:.1f}")
+    for name, check in results["parity"].items():
+        print(f"{name:10s} min cosine={check['min_cosine']:.4f} mean={check['mean_cosine']:.4f}")
+    print(f"saved to {save_results('encoder', results)}")
+
+
+if __name__ == "__main__":
+    main()
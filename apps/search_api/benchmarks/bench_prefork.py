@@ -0,0 +1,132 @@
+"""Memory and throughput of single-process, `uvicorn --workers` and prefork.py.
+
+Starts the real service in each mode (it needs the model and a reachable
+Qdrant, configured through the usual environment), drives /products with a
+fixed number of concurrent clients and sums RSS/PSS over the process tree.
+Linux only. Run from apps/search_api:
+
+    python -m benchmarks.bench_prefork --workers 4 --duration 30
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import SAMPLE_QUERIES, save_results, summarize
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                for child in f.read().split():
+                    pids.extend(process_tree(int(child)))
+        except FileNotFoundError:
+            pass
+    return pids
+
+
+def memory(pid: int) -> dict:
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0, "processes": 0}
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/smaps_rollup", "r") as f:
+                for line in f:
+                    key, value = line.split(":", 1)
+                    if key == "Rss":
+                        totals["rss_mb"] += int(value.split()[0]) / 1024
+                    elif key == "Pss":
+                        totals["pss_mb"] += int(value.split()[0]) / 1024
+            totals["processes"] += 1
+        except FileNotFoundError:
+            pass
+    return totals
+
+
+async def drive(base_url: str, concurrency: int, duration: float, query_type: str) -> dict:
+    queries = itertools.cycle(SAMPLE_QUERIES)
+    samples = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start_time = time.perf_counter()
+            response = await client.get("/products", params={"query": next(queries), "query_type": query_type})
+            samples.append(time.perf_counter() - start_time)
+            if response.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+
+    result = summarize(samples)
+    result["requests_per_second"] = len(samples) / duration
+    result["errors"] = errors
+    return result
+
+
+def wait_healthy(base_url: str, timeout: float = 300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Service at {base_url} did not become healthy")
+
+
+def run_mode(name: str, command: list[str], env: dict, args) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(command, env=env)
+    try:
+        start_time = time.perf_counter()
+        wait_healthy(base_url)
+        result = {"ready_seconds": time.perf_counter() - start_time, "memory_idle": memory(process.pid)}
+        result["load"] = asyncio.run(drive(base_url, args.concurrency, args.duration, args.query_type))
+        result["memory_loaded"] = memory(process.pid)
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--query-type", default="dense")
+    args = parser.parse_args()
+
+    # Caches off, so every request pays for encoding and the Qdrant call
+    env = dict(os.environ, RESULT_CACHE_SIZE="0", EMBEDDING_CACHE_SIZE="0", PORT=str(args.port))
+    uvicorn = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port)]
+    modes = {
+        "single": (uvicorn, dict(env)),
+        "uvicorn_workers": (uvicorn + ["--workers", str(args.workers)], dict(env)),
+        "prefork": ([sys.executable, "prefork.py"], dict(env, WEB_WORKERS=str(args.workers), HOST="127.0.0.1")),
+    }
+
+    results = {"workers": args.workers, "concurrency": args.concurrency, "modes": {}}
+    for name, (command, mode_env) in modes.items():
+        results["modes"][name] = run_mode(name, command, mode_env, args)
+        mode = results["modes"][name]
+        print(f"{name:16s} pss={mode['memory_loaded']['pss_mb']:.0f}MB "
+              f"rss={mode['memory_loaded']['rss_mb']:.0f}MB "
+              f"rps={mode['load']['requests_per_second']:.1f} p99={mode['load']['p99_ms']:.1f}ms")
+    print(f"saved to {save_results('prefork', results)}")
+
+
+if __name__ == "__main__":
+    main()
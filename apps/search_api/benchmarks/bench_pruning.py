@@ -0,0 +1,174 @@
+"""Check that IDF query pruning keeps recall@k while cutting sparse latency.
+
+By default synthetic product titles are encoded with BM25.raw_embed_batch
+(which gathers the corpus statistics at the same time) and loaded into
+Qdrant's :memory: mode. To check the real index instead, point it at the live
+collection and its statistics file:
+
+    python -m benchmarks.bench_pruning --min-idf 1.0
+    python -m benchmarks.bench_pruning --qdrant-url http://localhost:6333 \\
+        --collection product_collection_all_mpnet_base_v2 --stats corpus_stats.npz --queries queries.txt
+
+The pruning settings default to the service's QUERY_* variables. Exits
+non-zero when mean recall@k against unpruned queries falls below
+1 - tolerance. Local mode is a pure Python index, so its latencies only
+show the trend; use a real server for absolute numbers.
+
+Documents tied with the k-th full-query result all count as hits, since
+which of them the engine returns is arbitrary.
+"""
+import argparse
+import itertools
+import os
+import random
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Modifier, PointStruct, SparseVector, SparseVectorParams
+
+from bm25 import BM25
+from corpus_stats import CorpusStats
+from query_pruning import QueryPruner
+from benchmarks.common import SAMPLE_QUERIES, measure, save_results, synthetic_payload
+
+
+COLLECTION = "bench_pruning"
+
+
+def seed(client: QdrantClient, bm25: BM25, products: int, rng: random.Random) -> tuple[CorpusStats, list[str]]:
+    payloads = [synthetic_payload(i, rng) for i in range(products)]
+    documents = [payload["title"] for payload in payloads]
+    stats = CorpusStats()
+    offsets, indices, values = bm25.raw_embed_batch(documents, stats=stats)
+
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    # Qdrant applies the IDF at query time, which is what the pruner weighs
+    client.create_collection(
+        COLLECTION,
+        vectors_config={},
+        sparse_vectors_config={"sparse_vector": SparseVectorParams(modifier=Modifier.IDF)},
+    )
+    for start in range(0, products, 1000):
+        client.upsert(COLLECTION, points=[
+            PointStruct(
+                id=i,
+                vector={"sparse_vector": SparseVector(
+                    indices=indices[offsets[i]:offsets[i + 1]].tolist(),
+                    values=values[offsets[i]:offsets[i + 1]].tolist(),
+                )},
+                payload={"title": payloads[i]["title"]},
+            )
+            for i in range(start, min(start + 1000, products))
+        ])
+    # Queries in the corpus's own vocabulary: title prefixes
+    return stats, [" ".join(payload["title"].split()[:4]) for payload in rng.sample(payloads, 100)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--collection", default=None, help="Existing collection; needs --stats")
+    parser.add_argument("--stats", default=os.environ.get("CORPUS_STATS_PATH"))
+    parser.add_argument("--queries", default=None, help="Text file with one query per line")
+    parser.add_argument("--tokenizer", default=None, help="Directory holding tokenizer.json")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--min-idf", type=float, default=float(os.environ.get("QUERY_MIN_IDF", 0.0)))
+    parser.add_argument("--keep-weight", type=float, default=float(os.environ.get("QUERY_KEEP_WEIGHT", 1.0)))
+    parser.add_argument("--pruned-weight", type=float, default=float(os.environ.get("QUERY_PRUNED_WEIGHT", 0.0)))
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    bm25 = BM25(
+        stopwords_dir=os.path.abspath("./stopwards"),
+        languages=["english", "bengali"],
+        tokenizer_path=args.tokenizer,
+    )
+    rng = random.Random(42)
+    client = QdrantClient(url=args.qdrant_url, timeout=600) if args.qdrant_url else QdrantClient(":memory:")
+
+    if args.collection:
+        if not args.stats:
+            raise SystemExit("--collection needs --stats")
+        collection = args.collection
+        stats = CorpusStats.load(args.stats)
+        bm25.avg_len = stats.avg_len
+        queries = []
+    else:
+        collection = COLLECTION
+        stats, queries = seed(client, bm25, args.products, rng)
+
+    if args.queries:
+        with open(args.queries, "r") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    queries = SAMPLE_QUERIES + queries
+
+    pruner = QueryPruner(stats.idf(), args.min_idf, args.keep_weight, args.pruned_weight)
+    full = [vector for vector in bm25.raw_embed(queries) if vector["indices"]]
+    pruned = [pruner.prune(vector) for vector in full]
+
+    def search(vector: dict, limit: int) -> list:
+        return client.query_points(
+            collection, query=SparseVector(**vector), using="sparse_vector", limit=limit,
+        ).points
+
+    def top_k(vector: dict) -> list:
+        return [point.id for point in search(vector, args.k)]
+
+    def relevant(vector: dict) -> tuple[set, int]:
+        # Short titles tie a lot, and which of the tied documents fill the
+        # last places is arbitrary, so every document scoring at least the
+        # k-th score counts as a hit
+        limit = args.k
+        while True:
+            points = search(vector, limit)
+            if len(points) < limit or points[-1].score < points[args.k - 1].score - 1e-6:
+                break
+            limit *= 4
+        if not points:
+            return set(), 0
+        threshold = points[min(args.k, len(points)) - 1].score - 1e-6
+        return {point.id for point in points if point.score >= threshold}, min(args.k, len(points))
+
+    recall = []
+    for full_vector, pruned_vector in zip(full, pruned):
+        expected, count = relevant(full_vector)
+        if count:
+            recall.append(len(expected & set(top_k(pruned_vector))) / count)
+
+    if not recall:
+        raise SystemExit("No query matched any document")
+
+    def cycling(vectors: list[dict]):
+        vectors = itertools.cycle(vectors)
+        return lambda: top_k(next(vectors))
+
+    repeat = args.repeat if args.qdrant_url else min(args.repeat, 50)
+    results = {
+        "collection": collection,
+        "queries": len(full),
+        "k": args.k,
+        "min_idf": args.min_idf,
+        "keep_weight": args.keep_weight,
+        "pruned_weight": args.pruned_weight,
+        "terms_full": int(sum(len(vector["indices"]) for vector in full)),
+        "terms_sent": int(sum(len(vector["indices"]) for vector in pruned)),
+        "recall_at_k": float(np.mean(recall)),
+        "min_recall_at_k": float(np.min(recall)),
+        "full": measure(cycling(full), repeat=repeat, warmup=5),
+        "pruned": measure(cycling(pruned), repeat=repeat, warmup=5),
+    }
+    results["passed"] = results["recall_at_k"] >= 1 - args.tolerance
+
+    print(f"terms sent {results['terms_sent']}/{results['terms_full']}")
+    print(f"recall@{args.k} mean={results['recall_at_k']:.3f} min={results['min_recall_at_k']:.3f}")
+    print(f"sparse p50 full={results['full']['p50_ms']:.2f}ms pruned={results['pruned']['p50_ms']:.2f}ms")
+    print(f"saved to {save_results('pruning', results)}")
+    if not results["passed"]:
+        raise SystemExit(f"Recall@{args.k} {results['recall_at_k']} is below 1 - {args.tolerance}")
+
+
+if __name__ == "__main__":
+    main()
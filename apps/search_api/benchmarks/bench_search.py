@@ -0,0 +1,125 @@
+"""End-to-end /products benchmark against Qdrant's in-memory mode.
+
+Imports the service with the result cache disabled, points it at a local
+`:memory:` collection seeded with synthetic products encoded by the real
+models, and drives GET /products in-process through httpx's ASGI
+transport. Also times the title de-duplication loop on its own. Needs no
+network once ./ml_model and the tokenizer are present. Run from
+apps/search_api:
+
+    python -m benchmarks.bench_search --products 2000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+
+COLLECTION = "bench_search"
+
+# Must be set before main reads its configuration
+os.environ.setdefault("QDRANT_COLLECTION_NAME", COLLECTION)
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+os.environ.setdefault("EMBEDDING_CACHE_SIZE", "0")
+os.environ.setdefault("LOKI_SAMPLE_RATES", "INFO=0")
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, PointStruct, ScoredPoint, SparseVector, SparseVectorParams, VectorParams
+
+import main as service
+from planner import QUERY_TYPES
+from benchmarks.common import SAMPLE_QUERIES, measure, measure_async, save_results, synthetic_payload
+
+
+async def seed(client: AsyncQdrantClient, products: int, rng: random.Random):
+    payloads = [synthetic_payload(i, rng) for i in range(products)]
+    # Every product appears a few times under the same title, as listings
+    # from different sellers do, so de-duplication has work to do
+    for i in range(0, products, 4):
+        for j in range(i + 1, min(i + 3, products)):
+            payloads[j]["title"] = payloads[i]["title"]
+
+    titles = [payload["title"] for payload in payloads]
+    dense = service.model.encode(titles, batch_size=64)
+    sparse = service.bm25.raw_embed(titles)
+
+    await client.create_collection(
+        COLLECTION,
+        vectors_config={"dense_vector": VectorParams(size=len(dense[0]), distance=Distance.COSINE)},
+        sparse_vectors_config={"sparse_vector": SparseVectorParams()},
+    )
+    await client.upsert(COLLECTION, points=[
+        PointStruct(
+            id=i,
+            vector={"dense_vector": dense[i].tolist(), "sparse_vector": SparseVector(**sparse[i])},
+            payload=payloads[i],
+        )
+        for i in range(products)
+    ])
+
+
+def bench_dedup(limit: int, rng: random.Random, repeat: int) -> dict:
+    results = {}
+    for overfetch in (3, 10):
+        points = [
+            ScoredPoint(id=i, version=0, score=1 - i / 1000, payload={"title": f"product {rng.randint(0, limit * 2)}"})
+            for i in range(limit * overfetch)
+        ]
+        results[f"{limit * overfetch}_points"] = measure(
+            lambda: service.dedup_points(points, limit), repeat=repeat
+        )
+    return results
+
+
+async def bench_endpoint(limit: int, repeat: int) -> dict:
+    await service.startup_event()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for query_type in QUERY_TYPES:
+                queries = itertools.cycle(SAMPLE_QUERIES)
+
+                async def request():
+                    response = await client.get(
+                        "/products", params={"query": next(queries), "query_type": query_type, "limit": limit}
+                    )
+                    response.raise_for_status()
+
+                results[query_type] = await measure_async(request, repeat=repeat)
+    finally:
+        await service.shutdown_event()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    service.qdrant_client = AsyncQdrantClient(location=":memory:")
+
+    async def run():
+        await seed(service.qdrant_client, args.products, rng)
+        return await bench_endpoint(args.limit, args.repeat)
+
+    results = {
+        "products": args.products,
+        "limit": args.limit,
+        "dedup": bench_dedup(args.limit, rng, args.repeat * 10),
+        "endpoint": asyncio.run(run()),
+    }
+
+    for name, stats in results["dedup"].items():
+        print(f"dedup {name:12s} p50={stats['p50_ms'] * 1000:.1f}us")
+    for query_type, stats in results["endpoint"].items():
+        print(f"/products {query_type:7s} p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms")
+    print(f"saved to {save_results('search', results)}")
+
+
+if __name__ == "__main__":
+    main()
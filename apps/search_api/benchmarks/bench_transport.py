@@ -0,0 +1,163 @@
+"""Compare Qdrant's REST and gRPC transports for the service's query shapes.
+
+gRPC needs a real server, so this seeds a throwaway collection on one.
+Vectors are random, so no model is loaded; payloads are full synthetic
+products, as decoding them is part of what is measured. Run from
+apps/search_api:
+
+    python -m benchmarks.bench_transport --qdrant-url http://localhost:6333
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    Fusion,
+    FusionQuery,
+    PointStruct,
+    Prefetch,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from qdrant_transport import client_options, connect
+from benchmarks.common import measure_async, save_results, summarize, synthetic_payload
+
+
+COLLECTION = "bench_transport"
+VOCABULARY = 250000
+
+
+def random_sparse(rng: np.random.Generator, terms: int) -> SparseVector:
+    indices = rng.choice(VOCABULARY, size=terms, replace=False)
+    return SparseVector(indices=indices.tolist(), values=rng.random(terms).tolist())
+
+
+def seed(url: str, products: int, dim: int, rng: np.random.Generator):
+    client = QdrantClient(url=url, **client_options("grpc", 600, 1, 30))
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        COLLECTION,
+        vectors_config={"dense_vector": VectorParams(size=dim, distance=Distance.COSINE)},
+        sparse_vectors_config={"sparse_vector": SparseVectorParams()},
+    )
+    payload_rng = random.Random(42)
+    for start in range(0, products, 500):
+        ids = range(start, min(start + 500, products))
+        dense = rng.standard_normal((len(ids), dim), dtype=np.float32)
+        client.upsert(COLLECTION, points=[
+            PointStruct(
+                id=i,
+                vector={"dense_vector": dense[n].tolist(), "sparse_vector": random_sparse(rng, 24)},
+                payload=synthetic_payload(i, payload_rng),
+            )
+            for n, i in enumerate(ids)
+        ])
+    client.close()
+
+
+def query_args(query_type: str, dense: list[float], sparse: SparseVector, limit: int) -> dict:
+    if query_type == "hybrid":
+        return dict(
+            prefetch=[
+                Prefetch(query=dense, using="dense_vector", limit=limit * 2),
+                Prefetch(query=sparse, using="sparse_vector", limit=limit * 2),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=limit,
+        )
+    if query_type == "sparse":
+        return dict(query=sparse, using="sparse_vector", limit=limit)
+    return dict(query=dense, using="dense_vector", limit=limit)
+
+
+async def bench_transport(args, transport: str, queries: list) -> dict:
+    client = connect(
+        args.qdrant_url,
+        transport=transport,
+        pool_size=args.pool_size,
+        max_connections=args.concurrency,
+        grpc_port=args.grpc_port,
+    )
+    results = {}
+    try:
+        for query_type in ("dense", "sparse", "hybrid"):
+            cursor = iter(range(10 ** 9))
+
+            async def one_query():
+                dense, sparse = queries[next(cursor) % len(queries)]
+                await client.query_points(
+                    COLLECTION, with_payload=True, timeout=10,
+                    **query_args(query_type, dense, sparse, args.limit),
+                )
+
+            sequential = await measure_async(one_query, repeat=args.repeat)
+
+            # Closed batches of `concurrency` in flight, for throughput
+            samples = []
+
+            async def timed():
+                start_time = time.perf_counter()
+                await one_query()
+                samples.append(time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            for _ in range(max(1, args.repeat // args.concurrency)):
+                await asyncio.gather(*(timed() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start_time
+
+            results[query_type] = {
+                "sequential": sequential,
+                "concurrent": {**summarize(samples), "queries_per_second": len(samples) / elapsed},
+            }
+    finally:
+        await client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    seed(args.qdrant_url, args.products, args.dim, rng)
+    queries = [
+        (rng.standard_normal(args.dim, dtype=np.float32).tolist(), random_sparse(rng, 6))
+        for _ in range(200)
+    ]
+
+    results = {
+        "products": args.products,
+        "dim": args.dim,
+        "limit": args.limit,
+        "concurrency": args.concurrency,
+        "pool_size": args.pool_size,
+    }
+    for transport in ("rest", "grpc"):
+        results[transport] = asyncio.run(bench_transport(args, transport, queries))
+
+    for query_type in ("dense", "sparse", "hybrid"):
+        for transport in ("rest", "grpc"):
+            stats = results[transport][query_type]
+            print(f"{query_type:7s} {transport:5s} p50={stats['sequential']['p50_ms']:.2f}ms "
+                  f"p99={stats['sequential']['p99_ms']:.2f}ms "
+                  f"qps@{args.concurrency}={stats['concurrent']['queries_per_second']:.0f}")
+    print(f"saved to {save_results('transport', results)}")
+
+
+if __name__ == "__main__":
+    main()
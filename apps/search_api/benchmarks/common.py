@@ -0,0 +1,130 @@
+import json
+import os
+import platform
+import random
+import time
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BRANDS = ["Walton", "Xiaomi", "Samsung", "Asus", "Lenovo", "HP", "A4Tech", "Fantech"]
+CATEGORIES = ["Laptop", "Smartphone", "Monitor", "Headphone", "Keyboard", "Mouse", "Router"]
+WORDS_EN = [
+    "wireless", "gaming", "budget", "battery", "portable", "fast", "smart", "rgb",
+    "mechanical", "noise", "cancelling", "ultra", "slim", "student", "office", "4k",
+]
+# The k6 query mix from load_tests/search_api/load.js plus Bengali queries
+SAMPLE_QUERIES = [
+    "best budget smartphone 2025",
+    "lightweight laptop for students",
+    "wireless headphones with long battery life",
+    "affordable 4k smart tv",
+    "best wireless mouse for fps gaming",
+    "quietest mechanical keyboard with rgb for night gaming",
+    "affordable curved ultrawide monitor for productivity",
+    "headphones for airplane travel with noise cancellation",
+    "most powerful gaming laptop under $2000",
+    "energy efficient smart refrigerator with family hub",
+    "waterproof speaker for pool parties",
+    "best value 4k oled tv for movie watching",
+    "smart watch that tracks sleep and heart rate",
+    "robot vacuum for pet hair on carpets",
+    "healthiest air fryer for family of four",
+    "office chair for back pain relief",
+    "fastest external ssd for video editing",
+    "wifi system for large house with thick walls",
+    "portable power station for camping trips",
+    "doorbell camera with package theft detection",
+    "সাশ্রয়ী দামের স্মার্টফোন",
+    "ছাত্রদের জন্য হালকা ল্যাপটপ",
+    "দীর্ঘ ব্যাটারি লাইফ সহ ওয়্যারলেস হেডফোন",
+    "গেমিং মাউস",
+    "চাল ডাল তেল",
+    "ডায়াবেটিসের ওষুধ",
+]
+WORDS_BN = ["সাশ্রয়ী", "দ্রুত", "শক্তিশালী", "ব্যাটারি", "স্মার্ট", "হালকা", "গেমিং", "নতুন"]
+
+
+def summarize(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    count = len(samples)
+    return {
+        "count": count,
+        "mean_ms": sum(samples) / count * 1000,
+        "min_ms": samples[0] * 1000,
+        "p50_ms": samples[int(count * 0.50)] * 1000,
+        "p95_ms": samples[min(count - 1, int(count * 0.95))] * 1000,
+        "p99_ms": samples[min(count - 1, int(count * 0.99))] * 1000,
+    }
+
+
+def measure(fn, repeat: int = 200, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start_time)
+    return summarize(samples)
+
+
+async def measure_async(fn, repeat: int = 200, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        await fn()
+
+    samples = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start_time)
+    return summarize(samples)
+
+
+def synthetic_title(rng: random.Random) -> str:
+    words = rng.sample(WORDS_EN, 3) + rng.sample(WORDS_BN, rng.randint(0, 2))
+    return f"{rng.choice(BRANDS)} {' '.join(words)} {rng.choice(CATEGORIES)}"
+
+
+def synthetic_payload(i: int, rng: random.Random) -> dict:
+    """A product shaped like the StarTech spider output."""
+    category = rng.choice(CATEGORIES)
+    return {
+        "product_code": f"P{i:06d}",
+        "title": synthetic_title(rng),
+        "main_image": f"https://example.com/images/{i}/main.jpg",
+        "gallery": [f"https://example.com/images/{i}/{n}.jpg" for n in range(rng.randint(2, 6))],
+        "product_url": f"https://example.com/product/{i}",
+        "price": str(rng.randint(500, 250000)),
+        "currency": "BDT",
+        "brand": rng.choice(BRANDS),
+        "category": category,
+        "parent_category": category,
+        "description": {
+            f"Section {n}": " ".join(rng.choices(WORDS_EN + WORDS_BN, k=60)) for n in range(3)
+        },
+        "short_description": [" ".join(rng.choices(WORDS_EN, k=6)) for _ in range(4)],
+        "specification": {
+            "Basic Information": {
+                f"Spec {n}": " ".join(rng.choices(WORDS_EN, k=4)) for n in range(12)
+            },
+            "Warranty": {"Warranty Information": "1 year"},
+        },
+    }
+
+
+def save_results(name: str, results: dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y-%m-%dT%H-%M-%S')}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+    return path
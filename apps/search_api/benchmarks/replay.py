@@ -0,0 +1,318 @@
+"""Open-loop replay of a query log against the search service.
+
+Requests are sent on a fixed schedule, either at a constant or Poisson
+rate, or at the arrival times recorded in the log. They never wait for
+earlier responses. Latency is measured from each request's intended send
+time, so queueing in the service or in this client shows up in the
+percentiles instead of silently lowering the offered load.
+
+The log is JSON lines or plain text, one query per line. JSON records may
+carry `query` or `search_query` (as in the service's own search log),
+plus optional `query_type`, `limit` and `timestamp` (epoch seconds).
+Loki exports work too: entries with the log line under `line` and its
+`timestamp` (RFC 3339 or epoch nanoseconds), as written by
+`logcli query --output=jsonl`, or streams with `values` pairs from the
+query API. Run from apps/search_api:
+
+    python -m benchmarks.replay queries.jsonl --target http://localhost:8000 --rate 50
+    python -m benchmarks.replay queries.jsonl --in-process --recorded --speedup 4
+    python -m benchmarks.replay queries.jsonl --rate 50 --compare benchmarks/results/replay-<ts>.json
+
+`--in-process` replays against the service imported in this process,
+backed by a seeded Qdrant :memory: collection (see bench_search).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+
+from benchmarks.common import save_results
+
+
+PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """HDR-style histogram of microsecond latencies.
+
+    Values below `2 * 10**significant_figures` are stored exactly; larger
+    ones keep their top bits only, so every recorded value is within
+    10**-significant_figures of its bucket while memory stays bounded.
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        self.significant_figures = significant_figures
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        shift = max(0, value.bit_length() - self._sub_bucket_bits)
+        self.counts[(shift, value >> shift)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """Highest value equivalent to the percentile's bucket, in ms."""
+        if self.total == 0:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.total))
+        seen = 0
+        for shift, sub_bucket in sorted(self.counts, key=lambda bucket: bucket[1] << bucket[0]):
+            seen += self.counts[(shift, sub_bucket)]
+            if seen >= target:
+                return min(((sub_bucket + 1) << shift) - 1, self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_ms": self.sum / self.total / 1000 if self.total else 0.0,
+            **{f"p{percentile:g}_ms": self.percentile(percentile) for percentile in PERCENTILES},
+            "max_ms": self.max / 1000,
+            "significant_figures": self.significant_figures,
+            "buckets": [[shift, sub_bucket, count] for (shift, sub_bucket), count in sorted(self.counts.items())],
+        }
+
+
+def parse_timestamp(value) -> float | None:
+    """Epoch seconds from epoch seconds, epoch nanoseconds or RFC 3339."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    # Loki keeps nanoseconds; no log is from before 2001 in epoch seconds
+    return seconds / 1e9 if seconds > 1e12 else seconds
+
+
+def parse_row(line: str) -> dict:
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError:
+        row = line
+    if not isinstance(row, dict):
+        row = {"query": str(row)}
+    return row
+
+
+def loki_rows(row: dict) -> list[dict]:
+    """The log rows inside a Loki export entry, with the entry's time."""
+    if "values" in row:
+        entries = [{"timestamp": timestamp, "line": line} for timestamp, line in row["values"]]
+    else:
+        entries = [row]
+    rows = []
+    for entry in entries:
+        inner = parse_row(entry["line"])
+        inner.setdefault("timestamp", entry.get("timestamp"))
+        rows.append(inner)
+    return rows
+
+
+def load_log(path: str, default_query_type: str, default_limit: int) -> list[dict]:
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = parse_row(line)
+            rows = loki_rows(row) if "line" in row or "values" in row else [row]
+
+            for row in rows:
+                query = row.get("query") or row.get("search_query")
+                if not query:
+                    continue
+                records.append({
+                    "query": query,
+                    "query_type": row.get("query_type", default_query_type),
+                    "limit": int(row.get("limit", default_limit)),
+                    "timestamp": parse_timestamp(row.get("timestamp")),
+                })
+    # Loki returns the newest entries first by default
+    if records and all(record["timestamp"] is not None for record in records):
+        records.sort(key=lambda record: record["timestamp"])
+    return records
+
+
+def schedule(records: list[dict], args) -> list[float]:
+    """Send offsets in seconds from the start of the run."""
+    if args.recorded:
+        if any(record["timestamp"] is None for record in records):
+            raise SystemExit("--recorded needs a timestamp on every record")
+        first = float(records[0]["timestamp"])
+        return [(float(record["timestamp"]) - first) / args.speedup for record in records]
+
+    if args.poisson:
+        rng = random.Random(args.seed)
+        offsets, offset = [], 0.0
+        for _ in records:
+            offsets.append(offset)
+            offset += rng.expovariate(args.rate)
+        return offsets
+    return [i / args.rate for i in range(len(records))]
+
+
+async def replay(client: httpx.AsyncClient, records: list[dict], offsets: list[float]) -> dict:
+    histograms: dict[str, LatencyHistogram] = {}
+    statuses: dict[str, Counter] = {}
+    in_flight = 0
+    max_in_flight = 0
+
+    async def send(record: dict, intended: float):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        query_type = record["query_type"]
+        try:
+            response = await client.get("/products", params={
+                "query": record["query"], "query_type": query_type, "limit": record["limit"],
+            })
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError:
+            status = "error"
+        finally:
+            in_flight -= 1
+        # From the intended send time: a late start is part of the latency
+        histograms.setdefault(query_type, LatencyHistogram()).record(time.perf_counter() - intended)
+        statuses.setdefault(query_type, Counter())[status] += 1
+
+    tasks = []
+    start_time = time.perf_counter()
+    for record, offset in zip(records, offsets):
+        intended = start_time + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(record, intended)))
+    send_duration = time.perf_counter() - start_time
+    await asyncio.gather(*tasks)
+    duration = time.perf_counter() - start_time
+
+    overall = LatencyHistogram()
+    for histogram in histograms.values():
+        overall.counts.update(histogram.counts)
+        overall.total += histogram.total
+        overall.sum += histogram.sum
+        overall.max = max(overall.max, histogram.max)
+
+    return {
+        "requests": len(records),
+        "intended_rate": len(records) / offsets[-1] if offsets[-1] > 0 else None,
+        "achieved_send_rate": len(records) / send_duration if send_duration > 0 else None,
+        "duration_seconds": duration,
+        "max_in_flight": max_in_flight,
+        "overall": overall.summary(),
+        "query_types": {
+            query_type: {**histogram.summary(), "statuses": dict(statuses[query_type])}
+            for query_type, histogram in sorted(histograms.items())
+        },
+    }
+
+
+def compare(current: dict, previous_path: str):
+    with open(previous_path, "r") as f:
+        previous = json.load(f)["results"]
+
+    keys = [f"p{percentile:g}_ms" for percentile in PERCENTILES] + ["max_ms"]
+    print(f"{'':10s}" + "".join(f"{key:>20s}" for key in keys))
+    rows = {"overall": (current["overall"], previous.get("overall"))}
+    for query_type, stats in current["query_types"].items():
+        rows[query_type] = (stats, previous.get("query_types", {}).get(query_type))
+    for name, (now, before) in rows.items():
+        cells = []
+        for key in keys:
+            if before is None or not before.get(key):
+                cells.append(f"{now[key]:>20.2f}")
+            else:
+                change = (now[key] - before[key]) / before[key] * 100
+                cells.append(f"{now[key]:>11.2f} ({change:+5.1f}%)")
+        print(f"{name:10s}" + "".join(cells))
+
+
+async def run(args, records: list[dict], offsets: list[float]) -> dict:
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.target, timeout=timeout, limits=limits) as client:
+            return await replay(client, records, offsets)
+
+    from qdrant_client import AsyncQdrantClient
+    from benchmarks import bench_search
+
+    service = bench_search.service
+    service.qdrant_client = AsyncQdrantClient(location=":memory:")
+    await bench_search.seed(service.qdrant_client, args.products, random.Random(args.seed))
+    await service.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=timeout) as client:
+            return await replay(client, records, offsets)
+    finally:
+        await service.shutdown_event()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log", help="Query log: JSON lines or one query per line")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--target", default="http://localhost:8000")
+    target.add_argument("--in-process", action="store_true")
+    arrival = parser.add_mutually_exclusive_group()
+    arrival.add_argument("--rate", type=float, default=20.0, help="Requests per second")
+    arrival.add_argument("--recorded", action="store_true", help="Use the log's timestamps")
+    parser.add_argument("--poisson", action="store_true", help="Exponential gaps at --rate")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Time compression for --recorded")
+    parser.add_argument("--requests", type=int, default=None, help="Cycle or cut the log to this many")
+    parser.add_argument("--query-type", default="dense", help="For records without one")
+    parser.add_argument("--limit", type=int, default=5, help="For records without one")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--products", type=int, default=2000, help="Seeded products for --in-process")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--name", default="replay", help="Prefix of the saved report")
+    parser.add_argument("--compare", default=None, help="Earlier report to diff against")
+    args = parser.parse_args()
+
+    records = load_log(args.log, args.query_type, args.limit)
+    if not records:
+        raise SystemExit(f"No queries in {args.log}")
+    if args.requests is not None and not args.recorded:
+        records = (records * (args.requests // len(records) + 1))[:args.requests]
+
+    offsets = schedule(records, args)
+    results = asyncio.run(run(args, records, offsets))
+    results["config"] = {
+        "log": args.log,
+        "target": "in-process" if args.in_process else args.target,
+        "arrival": "recorded" if args.recorded else ("poisson" if args.poisson else "constant"),
+        "rate": None if args.recorded else args.rate,
+        "speedup": args.speedup if args.recorded else None,
+    }
+
+    overall = results["overall"]
+    print(f"{results['requests']} requests in {results['duration_seconds']:.1f}s, "
+          f"max in flight {results['max_in_flight']}")
+    for name, stats in [("overall", overall), *results["query_types"].items()]:
+        print(f"{name:10s} p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+              f"p99.9={stats['p99.9_ms']:.2f}ms max={stats['max_ms']:.2f}ms")
+    if args.compare:
+        compare(results, args.compare)
+    print(f"saved to {save_results(args.name, results)}")
+
+
+if __name__ == "__main__":
+    main()
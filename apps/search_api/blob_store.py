@@ -0,0 +1,168 @@
+import argparse
+import json
+import mmap
+import os
+import time
+
+from dotenv import load_dotenv
+from prometheus_client import Counter
+
+from file_lock import locked
+from planner import DEFAULT_FIELDS, parse_fields
+
+
+DATA_FILE = "products.bin"
+INDEX_FILE = "index.json"
+# Held shared while the two files are opened and exclusively while they
+# are swapped, so a reader never pairs new data with old offsets
+SWAP_LOCK = ".swap.lock"
+
+BLOB_STORE_RENDERS = Counter(
+    'blob_store_renders_total',
+    'Responses assembled from the blob store, by outcome',
+    ['status']
+)
+
+
+def render_payload(payload: dict, fields: tuple[str, ...] | None) -> bytes:
+    if fields is not None:
+        payload = {key: payload[key] for key in fields if key in payload}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class BlobStore:
+    """Pre-serialized product JSON, one blob per point ID.
+
+    Blobs live back to back in a memory-mapped file, and `index.json` maps
+    each point ID to its (offset, length). Responses are assembled by
+    joining blobs in ranked order, so payloads never go through dicts or
+    the JSON encoder on the request path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fields: tuple[str, ...] | None = None
+        self._offsets: dict[str, tuple[int, int]] = {}
+        self._file = None
+        self._mm: mmap.mmap | None = None
+        self._loaded_mtime = 0.0
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def reload(self) -> bool:
+        index_path = os.path.join(self.path, INDEX_FILE)
+        with locked(self.path, SWAP_LOCK, exclusive=False):
+            mtime = os.path.getmtime(index_path)
+            if mtime == self._loaded_mtime:
+                return False
+
+            with open(index_path, "r") as f:
+                index = json.load(f)
+
+            data_file = open(os.path.join(self.path, DATA_FILE), "rb")
+            data_mm = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) if index["offsets"] else None
+
+        old_file, old_mm = self._file, self._mm
+        self.fields = tuple(index["fields"]) if index["fields"] is not None else None
+        self._offsets = {point_id: tuple(span) for point_id, span in index["offsets"].items()}
+        self._file, self._mm = data_file, data_mm
+        self._loaded_mtime = mtime
+
+        if old_mm is not None:
+            old_mm.close()
+        if old_file is not None:
+            old_file.close()
+        return True
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._mm, self._file = None, None
+
+    def get(self, point_id) -> bytes | None:
+        span = self._offsets.get(str(point_id))
+        if span is None:
+            return None
+        offset, length = span
+        return self._mm[offset:offset + length]
+
+    def render(self, point_ids: list) -> bytes | None:
+        """JSON array of the given products, or None if any is unknown."""
+        blobs = []
+        for point_id in point_ids:
+            blob = self.get(point_id)
+            if blob is None:
+                BLOB_STORE_RENDERS.labels(status="stale").inc()
+                return None
+            blobs.append(blob)
+        BLOB_STORE_RENDERS.labels(status="hit").inc()
+        return b"[" + b",".join(blobs) + b"]"
+
+
+def build(client, collection_name: str, path: str, fields: tuple[str, ...] | None, batch_size: int = 256) -> int:
+    """Scroll the whole collection and write a blob store to `path`."""
+    os.makedirs(path, exist_ok=True)
+    data_path = os.path.join(path, DATA_FILE)
+    index_path = os.path.join(path, INDEX_FILE)
+
+    offsets: dict[str, tuple[int, int]] = {}
+    offset = 0
+    next_page = None
+
+    # Write to per-process temporary names and swap them in, so a running
+    # service never maps a half-written file
+    suffix = f".{os.getpid()}.tmp"
+    with open(data_path + suffix, "wb") as f:
+        while True:
+            points, next_page = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=next_page,
+                with_payload=list(fields) if fields is not None else True,
+                with_vectors=False,
+            )
+            for point in points:
+                blob = render_payload(point.payload, fields)
+                f.write(blob)
+                offsets[str(point.id)] = (offset, len(blob))
+                offset += len(blob)
+
+            if next_page is None:
+                break
+
+    with open(index_path + suffix, "w") as f:
+        json.dump({
+            "collection": collection_name,
+            "fields": list(fields) if fields is not None else None,
+            "built_at": time.time(),
+            "offsets": offsets,
+        }, f)
+
+    with locked(path, SWAP_LOCK):
+        os.replace(data_path + suffix, data_path)
+        os.replace(index_path + suffix, index_path)
+    return len(offsets)
+
+
+if __name__ == "__main__":
+    from qdrant_client import QdrantClient
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Build the pre-rendered product blob store")
+    parser.add_argument("--out", default=os.environ.get("BLOB_STORE_PATH", "./blob_store"))
+    parser.add_argument(
+        "--fields",
+        default=os.environ.get("DEFAULT_FIELDS", DEFAULT_FIELDS),
+        help="Comma separated payload keys, or '*' for the full payload",
+    )
+    args = parser.parse_args()
+    fields = parse_fields(args.fields)
+
+    client = QdrantClient(url=os.environ.get("QDRANT_URL"), timeout=600)
+    count = build(client, os.environ.get("QDRANT_COLLECTION_NAME"), args.out, fields)
+    print(f"Wrote {count} products to {args.out}")
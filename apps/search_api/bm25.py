@@ -1,7 +1,10 @@
+import itertools
 import os
 import re
 from collections import defaultdict
-from transformers import AutoTokenizer
+
+import numpy as np
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
 
 
 class BM25:
@@ -12,14 +15,21 @@ class BM25:
         k: float = 1.2,
         b: float = 0.75,
         avg_len: float = 256.0,
+        tokenizer_path: str | None = None,
     ):
         self.stopwords = self._load_stopwords(stopwords_dir, languages)
         self.k = k
         self.b = b
         self.avg_len = avg_len
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            "Cohere/multilingual-22-12", cache_dir=os.getcwd()
-        )
+        if tokenizer_path is not None:
+            # Pre-serialized fast tokenizer: no Hub lookup, nothing written
+            self.tokenizer = PreTrainedTokenizerFast(
+                tokenizer_file=os.path.join(tokenizer_path, "tokenizer.json")
+            )
+        else:
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                "Cohere/multilingual-22-12", cache_dir=os.getcwd()
+            )
 
     @classmethod
     def _load_stopwords(cls, model_dir: str, languages: list[str]) -> list[str]:
@@ -87,4 +97,82 @@ class BM25:
             cleaned_text = self._clean_text(document)
             token_id2value = self._term_frequency(cleaned_text)
             embeddings.append(token_id2value)
-        return embeddings
\ No newline at end of file
+        return embeddings
+
+    def term_counts(self, documents: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Token counts of a batch of documents as CSR arrays.
+
+        Returns (offsets, indices, counts, doc_lens): document i owns
+        indices[offsets[i]:offsets[i + 1]], in first-occurrence order as in
+        _term_frequency.
+        """
+        if not documents:
+            empty = np.zeros(0, dtype=np.int64)
+            return np.zeros(1, dtype=np.int64), empty, empty, empty
+
+        cleaned = [self._clean_text(document) for document in documents]
+        token_ids = self.tokenizer(cleaned, add_special_tokens=False)["input_ids"]
+
+        doc_lens = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(token_ids))
+        flat = np.fromiter(itertools.chain.from_iterable(token_ids), dtype=np.int64, count=int(doc_lens.sum()))
+        doc_of_token = np.repeat(np.arange(len(documents), dtype=np.int64), doc_lens)
+
+        # One (document, token) key per occurrence; return_index gives each
+        # pair's first occurrence, and sorting on it restores document order
+        # and, within a document, first-occurrence order
+        vocab = int(flat.max()) + 1 if flat.size else 1
+        _, first, counts = np.unique(doc_of_token * vocab + flat, return_index=True, return_counts=True)
+        order = np.argsort(first, kind="stable")
+        first, counts = first[order], counts[order]
+
+        offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(doc_of_token[first], minlength=len(documents)), out=offsets[1:])
+        return offsets, flat[first], counts, doc_lens
+
+    def saturate(self, counts: np.ndarray, doc_lens: np.ndarray, avg_len: float | None = None) -> np.ndarray:
+        """BM25 term weights for per-term counts and document lengths.
+
+        The operations and their order match _term_frequency exactly, so
+        the float64 results are bit-for-bit identical.
+        """
+        avg_len = self.avg_len if avg_len is None else avg_len
+        norm = 1 - self.b + self.b * doc_lens / avg_len
+        scores = counts * (self.k + 1)
+        scores /= counts + self.k * norm
+        return scores
+
+    def raw_embed_batch(
+        self, documents: list[str], batch_size: int = 1024, stats=None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bulk raw_embed for indexing, as CSR arrays (offsets, indices, values).
+
+        Document i's sparse vector is indices[offsets[i]:offsets[i + 1]]
+        and the matching slice of values, equal to raw_embed([document]).
+
+        With a CorpusStats, the documents are added to it in the same
+        tokenization pass and the weights use the updated average length,
+        which also becomes self.avg_len.
+        """
+        batches = []
+        for start in range(0, len(documents), batch_size):
+            offsets, indices, counts, doc_lens = self.term_counts(documents[start:start + batch_size])
+            if stats is not None:
+                stats.add(indices, doc_lens)
+            batches.append((offsets, indices, counts, doc_lens))
+
+        if stats is not None and stats.doc_count:
+            self.avg_len = stats.avg_len
+
+        all_offsets = [np.zeros(1, dtype=np.int64)]
+        all_indices = []
+        all_values = []
+        total = 0
+        for offsets, indices, counts, doc_lens in batches:
+            all_offsets.append(offsets[1:] + total)
+            all_indices.append(indices)
+            all_values.append(self.saturate(counts, np.repeat(doc_lens, np.diff(offsets))))
+            total += len(indices)
+
+        if not all_indices:
+            return all_offsets[0], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        return np.concatenate(all_offsets), np.concatenate(all_indices), np.concatenate(all_values)
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from prometheus_client import Counter, Gauge
+
+
+CACHE_HITS = Counter(
+    'cache_hits_total',
+    'Number of cache lookups that returned a live entry',
+    ['cache']
+)
+
+CACHE_MISSES = Counter(
+    'cache_misses_total',
+    'Number of cache lookups that found no live entry',
+    ['cache']
+)
+
+CACHE_EVICTIONS = Counter(
+    'cache_evictions_total',
+    'Number of cache entries dropped, by reason',
+    ['cache', 'reason']
+)
+
+SINGLEFLIGHT_JOINED = Counter(
+    'singleflight_joined_total',
+    'Number of calls that joined an identical in-flight computation',
+    ['name']
+)
+
+CACHE_ENTRIES = Gauge(
+    'cache_entries',
+    'Current number of entries held by the cache',
+    ['cache']
+)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split())
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    Not thread-safe: it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            CACHE_MISSES.labels(cache=self.name).inc()
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            CACHE_EVICTIONS.labels(cache=self.name, reason="expired").inc()
+            CACHE_MISSES.labels(cache=self.name).inc()
+            CACHE_ENTRIES.labels(cache=self.name).set(len(self._data))
+            return default
+
+        self._data.move_to_end(key)
+        CACHE_HITS.labels(cache=self.name).inc()
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            CACHE_EVICTIONS.labels(cache=self.name, reason="size").inc()
+
+        CACHE_ENTRIES.labels(cache=self.name).set(len(self._data))
+
+    def clear(self):
+        if self._data:
+            CACHE_EVICTIONS.labels(cache=self.name, reason="cleared").inc(len(self._data))
+        self._data.clear()
+        CACHE_ENTRIES.labels(cache=self.name).set(0)
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one computation.
+
+    The computation runs as its own task, so a caller going away (e.g. a
+    client disconnect or deadline) does not cancel it for the others
+    waiting on it. Once the last waiter is gone it is cancelled, so
+    abandoned work does not keep running outside admission control.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[Hashable, int] = {}
+
+    def _done(self, key: Hashable):
+        self._inflight.pop(key, None)
+        self._waiters.pop(key, None)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._done(key))
+        else:
+            SINGLEFLIGHT_JOINED.labels(name=self.name).inc()
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if not task.done():
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
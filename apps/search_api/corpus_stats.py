@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+
+STATS_FILE = "corpus_stats.npz"
+
+
+class CorpusStats:
+    """BM25 corpus statistics: document count, total length and per-token
+    document frequency.
+
+    Updated from the CSR arrays of BM25.term_counts, so they are gathered
+    in the same tokenization pass as encoding (see BM25.raw_embed_batch)
+    and kept up to date as products are added, changed or removed instead
+    of recomputed.
+    """
+
+    def __init__(self, doc_count: int = 0, total_len: int = 0, df: np.ndarray | None = None):
+        self.doc_count = doc_count
+        self.total_len = total_len
+        self.df = df if df is not None else np.zeros(0, dtype=np.int64)
+
+    @property
+    def avg_len(self) -> float:
+        return self.total_len / self.doc_count if self.doc_count else 0.0
+
+    def _df_delta(self, indices: np.ndarray) -> np.ndarray:
+        # A token appears at most once per document in term_counts output,
+        # so its occurrences across the batch count the documents holding it
+        delta = np.bincount(indices, minlength=len(self.df))
+        if len(delta) > len(self.df):
+            self.df = np.concatenate([self.df, np.zeros(len(delta) - len(self.df), dtype=np.int64)])
+        return delta
+
+    def add(self, indices: np.ndarray, doc_lens: np.ndarray):
+        # _df_delta may grow self.df, so it must run before self.df is read
+        delta = self._df_delta(indices)
+        self.df += delta
+        self.doc_count += len(doc_lens)
+        self.total_len += int(doc_lens.sum())
+
+    def remove(self, indices: np.ndarray, doc_lens: np.ndarray):
+        delta = self._df_delta(indices)
+        if len(doc_lens) > self.doc_count or np.any(delta > self.df):
+            raise ValueError("Removing documents that were never added to the corpus statistics")
+        self.df -= delta
+        self.doc_count -= len(doc_lens)
+        self.total_len -= int(doc_lens.sum())
+
+    def idf(self) -> np.ndarray:
+        """BM25 (Lucene) IDF indexed by token ID.
+
+        Tokens absent from the corpus, including IDs past the end of the
+        array, have the maximum IDF, log((doc_count + 0.5) / 0.5 + 1).
+        """
+        return np.log((self.doc_count - self.df + 0.5) / (self.df + 0.5) + 1)
+
+    def save(self, path: str):
+        # Written under a temporary name and swapped in, so a reader never
+        # sees a half-written file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                doc_count=np.int64(self.doc_count),
+                total_len=np.int64(self.total_len),
+                df=self.df,
+                saved_at=np.float64(time.time()),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusStats":
+        with np.load(path) as data:
+            return cls(int(data["doc_count"]), int(data["total_len"]), data["df"].astype(np.int64))
+
+
+def update(bm25, stats: CorpusStats, added: list[str] | None = None, removed: list[str] | None = None):
+    """Apply product changes without re-reading the corpus.
+
+    A changed product is removed with its old text and added with its new
+    one. Full re-indexing should pass the stats to BM25.raw_embed_batch
+    instead, which gathers them while encoding.
+    """
+    if removed:
+        _, indices, _, doc_lens = bm25.term_counts(removed)
+        stats.remove(indices, doc_lens)
+    if added:
+        _, indices, _, doc_lens = bm25.term_counts(added)
+        stats.add(indices, doc_lens)
+
+
+def build(client, bm25, collection_name: str, path: str, field: str = "title", batch_size: int = 1024) -> CorpusStats:
+    """Gather statistics for a collection that is already indexed."""
+    stats = CorpusStats()
+    next_page = None
+    while True:
+        points, next_page = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=next_page,
+            with_payload=[field],
+            with_vectors=False,
+        )
+        texts = [point.payload.get(field) or "" for point in points]
+        update(bm25, stats, added=texts)
+        if next_page is None:
+            break
+    stats.save(path)
+    return stats
+
+
+if __name__ == "__main__":
+    from qdrant_client import QdrantClient
+    from bm25 import BM25
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Gather BM25 corpus statistics for an indexed collection")
+    parser.add_argument("--out", default=os.environ.get("CORPUS_STATS_PATH", STATS_FILE))
+    parser.add_argument("--field", default="title", help="Payload field the sparse vectors were built from")
+    parser.add_argument("--tokenizer", default=None, help="Directory holding tokenizer.json")
+    args = parser.parse_args()
+
+    bm25 = BM25(
+        stopwords_dir=os.path.abspath("./stopwards"),
+        languages=["english", "bengali"],
+        tokenizer_path=args.tokenizer,
+    )
+    client = QdrantClient(url=os.environ.get("QDRANT_URL"), timeout=600)
+    stats = build(client, bm25, os.environ.get("QDRANT_COLLECTION_NAME"), args.out, args.field)
+    print(json.dumps({
+        "documents": stats.doc_count,
+        "avg_len": stats.avg_len,
+        "vocabulary": int(np.count_nonzero(stats.df)),
+        "path": args.out,
+    }, indent=2))
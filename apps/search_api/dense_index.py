@@ -0,0 +1,204 @@
+import argparse
+import json
+import mmap
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client.models import Distance, ScoredPoint
+
+from file_lock import locked
+
+
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.jsonl"
+META_FILE = "meta.json"
+OFFSETS_FILE = "offsets.npy"
+# Bumped when the file layout changes; older snapshots are rebuilt
+SNAPSHOT_VERSION = 2
+# Held shared while a snapshot is read and exclusively while one is swapped
+# in, so a reader never mixes files from two snapshots
+SWAP_LOCK = ".swap.lock"
+# Held by whoever rebuilds, so processes sharing a path build it once
+BUILD_LOCK = ".build.lock"
+
+
+def read_meta(path: str) -> dict | None:
+    """The metadata of the snapshot at `path`, or None if there is none."""
+    try:
+        with open(os.path.join(path, META_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def snapshot(
+    client,
+    collection_name: str,
+    path: str,
+    vector_name: str = "dense_vector",
+    batch_size: int = 512,
+) -> int:
+    """Copy every dense vector and payload of the collection into `path`.
+
+    Vectors are stored as one float16 matrix, L2-normalised when the
+    collection uses cosine distance, and payloads as JSON lines in the same
+    row order. `offsets.npy` holds each line's byte offset (plus the end of
+    the file), so a row's payload can be read without parsing the others.
+    """
+    started_at = time.time()
+    info = client.get_collection(collection_name)
+    vector_params = info.config.params.vectors[vector_name]
+    normalize = vector_params.distance == Distance.COSINE
+
+    os.makedirs(path, exist_ok=True)
+    # Per-process temporary names: two writers never interleave in one file
+    suffix = f".{os.getpid()}.tmp"
+    chunks = []
+    offsets = [0]
+    next_page = None
+
+    with open(os.path.join(path, PAYLOADS_FILE + suffix), "wb") as f:
+        while True:
+            points, next_page = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=next_page,
+                with_payload=True,
+                with_vectors=[vector_name],
+            )
+            if points:
+                matrix = np.asarray([point.vector[vector_name] for point in points], dtype=np.float32)
+                if normalize:
+                    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                chunks.append(matrix.astype(np.float16))
+
+                for point in points:
+                    line = json.dumps({"id": point.id, "payload": point.payload}, ensure_ascii=False)
+                    line = line.encode("utf-8") + b"\n"
+                    f.write(line)
+                    offsets.append(offsets[-1] + len(line))
+
+            if next_page is None:
+                break
+
+    count = len(offsets) - 1
+    vectors = np.concatenate(chunks) if chunks else np.zeros((0, vector_params.size), dtype=np.float16)
+    # np.save would append ".npy" to a name that does not end with it
+    with open(os.path.join(path, VECTORS_FILE + suffix), "wb") as f:
+        np.save(f, vectors)
+    with open(os.path.join(path, OFFSETS_FILE + suffix), "wb") as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+
+    with open(os.path.join(path, META_FILE + suffix), "w") as f:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "collection": collection_name,
+            "vector_name": vector_name,
+            "count": count,
+            "dim": vector_params.size,
+            "normalized": normalize,
+            # Changes made after started_at may be missing from the snapshot
+            "started_at": started_at,
+            "built_at": time.time(),
+        }, f)
+
+    with locked(path, SWAP_LOCK):
+        for name in (VECTORS_FILE, PAYLOADS_FILE, OFFSETS_FILE, META_FILE):
+            os.replace(os.path.join(path, name + suffix), os.path.join(path, name))
+    return count
+
+
+class DenseIndex:
+    """Exact in-process dense search over a memory-mapped float16 snapshot.
+
+    Scores are dot products against the (normalised) matrix, computed in
+    float32 chunks so the whole matrix is never upcast at once. Top-k uses
+    argpartition, so only the candidates are fully sorted. Payloads stay
+    in the memory-mapped JSON lines file and only the top-k rows are
+    decoded, so workers share the pages instead of each holding dicts.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 16384):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._snapshot[3])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._snapshot[3].nbytes)
+
+    @property
+    def built_at(self) -> float:
+        return self._snapshot[0]["built_at"]
+
+    def load(self):
+        with locked(self.path, SWAP_LOCK, exclusive=False):
+            with open(os.path.join(self.path, META_FILE), "r") as f:
+                meta = json.load(f)
+
+            # The mappings keep the files open, so a later swap does not
+            # pull them from under this snapshot. An old mapping is closed
+            # when the last search using it lets go of it
+            offsets = np.load(os.path.join(self.path, OFFSETS_FILE), mmap_mode="r")
+            payloads = None
+            if len(offsets) > 1:
+                with open(os.path.join(self.path, PAYLOADS_FILE), "rb") as f:
+                    payloads = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r")
+        if len(vectors) != len(offsets) - 1:
+            raise ValueError(f"Dense index at {self.path} is inconsistent: "
+                             f"{len(vectors)} vectors, {len(offsets) - 1} payloads")
+
+        # A single attribute swap, so a concurrent search never mixes the
+        # vectors of one snapshot with the payloads of another
+        self._snapshot = (meta, offsets, payloads, vectors)
+
+    def _scores(self, meta: dict, vectors: np.ndarray, query_vector) -> np.ndarray:
+        query = np.asarray(query_vector, dtype=np.float32)
+        if meta["normalized"]:
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), self.chunk_size):
+            chunk = vectors[start:start + self.chunk_size]
+            np.dot(chunk.astype(np.float32), query, out=scores[start:start + len(chunk)])
+        return scores
+
+    def search(self, query_vector, limit: int, fields: tuple[str, ...] | None = None) -> list[ScoredPoint]:
+        meta, offsets, payloads, vectors = self._snapshot
+        scores = self._scores(meta, vectors, query_vector)
+        if len(scores) == 0:
+            return []
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        points = []
+        for row in top:
+            record = json.loads(payloads[offsets[row]:offsets[row + 1]])
+            payload = record["payload"]
+            if fields is not None:
+                payload = {key: payload[key] for key in fields if key in payload}
+            points.append(ScoredPoint(id=record["id"], version=0, score=float(scores[row]), payload=payload))
+        return points
+
+
+if __name__ == "__main__":
+    from qdrant_client import QdrantClient
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Snapshot the dense vectors for in-process search")
+    parser.add_argument("--out", default=os.environ.get("DENSE_INDEX_PATH", "./dense_index"))
+    args = parser.parse_args()
+
+    client = QdrantClient(url=os.environ.get("QDRANT_URL"), timeout=600)
+    with locked(args.out, BUILD_LOCK):
+        count = snapshot(client, os.environ.get("QDRANT_COLLECTION_NAME"), args.out)
+    print(f"Wrote {count} vectors to {args.out}")
@@ -0,0 +1,16 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def locked(path: str, name: str, exclusive: bool = True):
+    """flock on `path`/`name`, a lock file shared by every process using
+    the directory."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, name), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
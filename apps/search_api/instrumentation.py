@@ -21,6 +21,7 @@ from opentelemetry.exporter.prometheus import PrometheusMetricReader
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from prometheus_client import start_http_server
 import uuid
+from cache import TTLCache
 
 # Custom JSON formatter for logs (for better Loki integration)
 class JsonFormatter(logging.Formatter):
@@ -170,8 +171,8 @@ sample_data = [
     {"id": 5, "title": "Grafana Dashboards", "content": "Creating effective dashboards"},
 ]
 
-# Simple in-memory cache
-cache = {}
+# Bounded in-memory cache
+cache = TTLCache("search", maxsize=1024, ttl=300)
 
 app = FastAPI(title="Search API Demo")
 
@@ -284,13 +285,14 @@ async def search(q: str, timeout: float = 5.0, request: Request = None):
         })
         
         # Check cache
-        if q in cache:
+        cached_results = cache.get(q)
+        if cached_results is not None:
             logger.info(
                 f"Cache hit for query: '{q}'",
                 extra=logger_extra
             )
             cache_hit_counter.add(1)
-            return cache[q]
+            return cached_results
         
         logger.info(
             f"Cache miss for query: '{q}'",
@@ -308,7 +310,7 @@ async def search(q: str, timeout: float = 5.0, request: Request = None):
             results = await asyncio.wait_for(search_task, timeout=timeout)
             
             # Cache the results
-            cache[q] = results
+            cache.set(q, results)
             
             logger.info(
                 f"Search successful for query: '{q}', found {len(results)} results",
@@ -0,0 +1,177 @@
+import gzip
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+LOG_RECORDS_SHIPPED = Counter(
+    'log_records_shipped_total',
+    'Log records pushed to Loki'
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total',
+    'Log records not pushed to Loki, by reason',
+    ['reason']
+)
+
+LOG_QUEUE_DEPTH = Gauge(
+    'log_queue_depth',
+    'Log records waiting to be shipped'
+)
+
+LOG_PUSH_LATENCY = Histogram(
+    'log_push_seconds',
+    'Duration of one batched push to Loki',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(spec: str) -> dict[int, float]:
+    """Parse "DEBUG=0,INFO=0.1" into {logging.DEBUG: 0.0, logging.INFO: 0.1}."""
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        level, rate = item.split("=")
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+
+class LokiShipper(logging.Handler):
+    """Logging handler that never does I/O on the calling thread.
+
+    `emit` only samples the record and puts it on a bounded queue, dropping
+    it if the queue is full. A background thread drains the queue and pushes
+    batches to Loki as gzip-compressed JSON, one stream per level.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        tags: dict[str, str],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        sample_rates: dict[int, float] | None = None,
+        timeout: float = 5.0,
+    ):
+        super().__init__()
+        self.url = url
+        self.tags = tags
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rates = sample_rates or {}
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def emit(self, record: logging.LogRecord):
+        rate = self.sample_rates.get(record.levelno, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+    def start(self):
+        """Start the shipper thread; call it in the process that serves.
+
+        Threads do not survive fork, so under prefork.py every worker
+        starts its own.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="loki-shipper", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + self.flush_interval)
+            self._thread = None
+        super().close()
+
+    def _drain(self) -> list[logging.LogRecord]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._drain()
+            LOG_QUEUE_DEPTH.set(self._queue.qsize())
+            if batch:
+                self._push(batch)
+
+        # Flush whatever is left on shutdown
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(batch), self.batch_size):
+            self._push(batch[start:start + self.batch_size])
+        LOG_QUEUE_DEPTH.set(0)
+
+    def _line(self, record: logging.LogRecord) -> str:
+        entry = {"message": record.getMessage(), "logger": record.name}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = logging.Formatter().formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def _payload(self, batch: list[logging.LogRecord]) -> bytes:
+        streams: dict[str, list] = {}
+        for record in batch:
+            timestamp = str(int(record.created * 1e9))
+            streams.setdefault(record.levelname.lower(), []).append([timestamp, self._line(record)])
+        body = {
+            "streams": [
+                {"stream": {**self.tags, "severity": level}, "values": values}
+                for level, values in streams.items()
+            ]
+        }
+        return gzip.compress(json.dumps(body).encode("utf-8"))
+
+    def _push(self, batch: list[logging.LogRecord]):
+        start_time = time.perf_counter()
+        try:
+            request = urllib.request.Request(
+                self.url,
+                data=self._payload(batch),
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception:
+            LOG_RECORDS_DROPPED.labels(reason="push_failed").inc(len(batch))
+            return
+        finally:
+            LOG_PUSH_LATENCY.observe(time.perf_counter() - start_time)
+        LOG_RECORDS_SHIPPED.inc(len(batch))
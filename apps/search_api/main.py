@@ -1,19 +1,46 @@
 from fastapi import FastAPI, HTTPException, Request
-from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Prefetch,
     SparseVector,
     FusionQuery,
     Fusion,
+    QueryRequest,
 )
+from pydantic import BaseModel
 from bm25 import BM25
+from batcher import EncodeBatcher
+from cache import SingleFlight, TTLCache, normalize_query
+from planner import QUERY_TYPES, SearchPlan, build_plan, parse_fields
+from blob_store import BlobStore
+from title_key import TITLE_KEY_FIELD
+from dense_index import BUILD_LOCK, SNAPSHOT_VERSION, DenseIndex, read_meta, snapshot as snapshot_dense_index
+from file_lock import locked
+import planner
+from timing import request_timings, server_timing, time_stage, time_startup
+from artifacts import Artifacts
+from corpus_stats import CorpusStats
+from query_pruning import QueryPruner
+from qdrant_transport import client_options, connect
+from admission import AdmissionController, Overloaded, check_deadline, remaining_budget, remaining_timeout
 import os
 from dotenv import load_dotenv
 import time
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
-from logging_loki import LokiHandler
+import asyncio
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    CONTENT_TYPE_LATEST,
+)
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from log_shipping import LokiShipper, parse_sample_rates
+from profiler import ProfilerBusy, SamplingProfiler, SlowRequestLog, to_collapsed, to_speedscope
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
@@ -22,6 +49,83 @@ load_dotenv()
 
 QDRANT_COLLECTION_NAME = os.environ.get("QDRANT_COLLECTION_NAME")
 QDRANT_URL = os.environ.get("QDRANT_URL")
+ENCODER_WORKERS = int(os.environ.get("ENCODER_WORKERS", 2))
+ENCODE_MAX_BATCH_SIZE = int(os.environ.get("ENCODE_MAX_BATCH_SIZE", 16))
+ENCODE_MAX_WAIT_MS = float(os.environ.get("ENCODE_MAX_WAIT_MS", 2.0))
+# Versioned offline artifacts (see artifacts.py); when set, nothing is
+# fetched from the Hub and startup fails fast if anything is missing
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR")
+artifacts = Artifacts(ARTIFACT_DIR) if ARTIFACT_DIR else None
+MODEL_VERSION = os.environ.get("MODEL_VERSION", artifacts.version if artifacts else "ml_model")
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_TTL = float(os.environ.get("EMBEDDING_CACHE_TTL", 3600))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 300))
+RESULT_CACHE_CHECK_INTERVAL = float(os.environ.get("RESULT_CACHE_CHECK_INTERVAL", 30))
+# Touched by POST /cache/invalidate; every process sharing it invalidates
+# its own caches on its next check. prefork.py sets one for its workers
+CACHE_GENERATION_FILE = os.environ.get("CACHE_GENERATION_FILE")
+OVERFETCH_FACTOR = float(os.environ.get("OVERFETCH_FACTOR", 3))
+PREFETCH_FACTOR = float(os.environ.get("PREFETCH_FACTOR", 2))
+MIN_SCORE = float(os.environ.get("MIN_SCORE", 0.4))
+# "group" pushes title de-duplication and the score threshold down to
+# Qdrant; it needs the key backfilled first with `python title_key.py`
+DEDUP_MODE = os.environ.get("DEDUP_MODE", "client")
+DEDUP_GROUP_KEY = os.environ.get("DEDUP_GROUP_KEY", TITLE_KEY_FIELD)
+# "embedded" answers dense queries from an in-process snapshot of the
+# collection instead of a Qdrant round trip
+DENSE_BACKEND = os.environ.get("DENSE_BACKEND", "qdrant")
+DENSE_INDEX_PATH = os.environ.get("DENSE_INDEX_PATH", "./dense_index")
+# "onnx" runs the int8 export made by `python onnx_encoder.py export`
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+ONNX_MODEL_PATH = os.environ.get(
+    "ONNX_MODEL_PATH", artifacts.onnx_path if artifacts and ENCODER_BACKEND == "onnx" else "./ml_model_onnx"
+)
+# Intra-op threads per process for the ONNX encoder; prefork.py splits the
+# cores between its workers. 0 lets ONNX Runtime use every core
+ENCODER_THREADS = int(os.environ.get("ENCODER_THREADS", 0))
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", 256))
+QDRANT_TIMEOUT = int(os.environ.get("QDRANT_TIMEOUT", 10))
+# "grpc" skips JSON encoding of query vectors and decoding of payloads
+QDRANT_TRANSPORT = os.environ.get("QDRANT_TRANSPORT", "rest")
+QDRANT_GRPC_PORT = int(os.environ.get("QDRANT_GRPC_PORT", 6334))
+QDRANT_POOL_SIZE = int(os.environ.get("QDRANT_POOL_SIZE", 1))
+QDRANT_KEEPALIVE_SECONDS = float(os.environ.get("QDRANT_KEEPALIVE_SECONDS", 30))
+MAX_CONCURRENT_SEARCHES = int(os.environ.get("MAX_CONCURRENT_SEARCHES", 32))
+MAX_QUEUED_SEARCHES = int(os.environ.get("MAX_QUEUED_SEARCHES", 64))
+SEARCH_DEADLINE_SECONDS = float(os.environ.get("SEARCH_DEADLINE_SECONDS", 5.0))
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", 1))
+# Degradation ladder for hybrid search: when dense encoding overruns its
+# slice of the budget, answer from BM25 alone
+DEGRADE_HYBRID = os.environ.get("DEGRADE_HYBRID", "true").lower() == "true"
+DENSE_ENCODE_BUDGET_MS = float(os.environ.get("DENSE_ENCODE_BUDGET_MS", 250))
+DENSE_ENCODE_BUDGET_FRACTION = float(os.environ.get("DENSE_ENCODE_BUDGET_FRACTION", 0.5))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DEFAULT_FIELDS = os.environ.get("DEFAULT_FIELDS", planner.DEFAULT_FIELDS)
+BLOB_STORE_PATH = os.environ.get("BLOB_STORE_PATH")
+# Written by the indexer or `python corpus_stats.py`; supplies BM25's
+# average document length
+CORPUS_STATS_PATH = os.environ.get("CORPUS_STATS_PATH")
+# IDF pruning of sparse query terms, using the IDF table from the corpus
+# statistics; check recall with `python -m benchmarks.bench_pruning`
+QUERY_PRUNING = os.environ.get("QUERY_PRUNING", "false").lower() == "true"
+QUERY_MIN_IDF = float(os.environ.get("QUERY_MIN_IDF", 0.0))
+QUERY_KEEP_WEIGHT = float(os.environ.get("QUERY_KEEP_WEIGHT", 1.0))
+QUERY_PRUNED_WEIGHT = float(os.environ.get("QUERY_PRUNED_WEIGHT", 0.0))
+LOKI_URL = os.environ.get("LOKI_URL", "http://localhost:3100/loki/api/v1/push")
+LOKI_QUEUE_SIZE = int(os.environ.get("LOKI_QUEUE_SIZE", 10000))
+LOKI_BATCH_SIZE = int(os.environ.get("LOKI_BATCH_SIZE", 500))
+LOKI_FLUSH_INTERVAL = float(os.environ.get("LOKI_FLUSH_INTERVAL", 1.0))
+# Fraction of records kept per level, e.g. "DEBUG=0,INFO=0.1"
+LOKI_SAMPLE_RATES = parse_sample_rates(os.environ.get("LOKI_SAMPLE_RATES", "INFO=1"))
+# /debug endpoints, POST /cache/invalidate and POST /dense-index/refresh
+# are disabled unless a token is set; callers send it in the
+# X-Debug-Token header
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN")
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 30))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 10))
+SLOW_REQUEST_LOG_SIZE = int(os.environ.get("SLOW_REQUEST_LOG_SIZE", 20))
+SLOW_REQUEST_WINDOW = float(os.environ.get("SLOW_REQUEST_WINDOW", 300))
 
 app = FastAPI()
 
@@ -33,21 +137,129 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-loki_handler = LokiHandler(
-    url="http://localhost:3100/loki/api/v1/push",  # Adjust if Loki is remote
+loki_handler = LokiShipper(
+    url=LOKI_URL,
     tags={"app": "fastapi-search-service"},
-    version="1",
+    max_queue=LOKI_QUEUE_SIZE,
+    batch_size=LOKI_BATCH_SIZE,
+    flush_interval=LOKI_FLUSH_INTERVAL,
+    sample_rates=LOKI_SAMPLE_RATES,
 )
 
 logger = logging.getLogger("loki_logger")
 logger.setLevel(logging.INFO)
 logger.addHandler(loki_handler)
 
-model = SentenceTransformer("./ml_model")
-bm25 = BM25(
-    stopwords_dir=os.path.abspath("./stopwards"), languages=["english", "bengali"]
+with time_startup("dense_model"):
+    if ENCODER_BACKEND == "onnx":
+        from onnx_encoder import OnnxEncoder
+        model = OnnxEncoder(ONNX_MODEL_PATH, threads=ENCODER_THREADS or None)
+    elif artifacts:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(artifacts.model_path, local_files_only=True)
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("./ml_model")
+with time_startup("bm25"):
+    bm25 = BM25(
+        stopwords_dir=os.path.abspath("./stopwards"),
+        languages=["english", "bengali"],
+        tokenizer_path=artifacts.tokenizer_path if artifacts else None,
+    )
+corpus_stats_mtime = 0.0
+query_pruner = None
+
+
+def load_corpus_stats():
+    """Pick up a newer corpus statistics file, if one is configured.
+
+    The sparse embedding cache is keyed on the file's mtime, so entries
+    made with the old statistics are simply never hit again.
+    """
+    global corpus_stats_mtime, query_pruner
+    if not CORPUS_STATS_PATH:
+        return
+    mtime = os.path.getmtime(CORPUS_STATS_PATH)
+    if mtime == corpus_stats_mtime:
+        return
+    stats = CorpusStats.load(CORPUS_STATS_PATH)
+    if stats.doc_count:
+        bm25.avg_len = stats.avg_len
+        if QUERY_PRUNING:
+            query_pruner = QueryPruner(
+                stats.idf(),
+                min_idf=QUERY_MIN_IDF,
+                keep_weight=QUERY_KEEP_WEIGHT,
+                pruned_weight=QUERY_PRUNED_WEIGHT,
+            )
+    corpus_stats_mtime = mtime
+
+
+def sparse_embed(texts: list[str]) -> list[dict]:
+    embeddings = bm25.raw_embed(texts)
+    pruner = query_pruner
+    if pruner is None:
+        return embeddings
+    return [pruner.prune(embedding) for embedding in embeddings]
+
+
+def sparse_key_prefix() -> tuple:
+    return (bm25.avg_len, corpus_stats_mtime)
+
+
+with time_startup("corpus_stats"):
+    load_corpus_stats()
+qdrant_client = connect(
+    QDRANT_URL,
+    transport=QDRANT_TRANSPORT,
+    pool_size=QDRANT_POOL_SIZE,
+    timeout=QDRANT_TIMEOUT,
+    max_connections=MAX_CONCURRENT_SEARCHES,
+    keepalive_seconds=QDRANT_KEEPALIVE_SECONDS,
+    grpc_port=QDRANT_GRPC_PORT,
+)
+search_admission = AdmissionController(
+    "search",
+    max_concurrency=MAX_CONCURRENT_SEARCHES,
+    max_queue=MAX_QUEUED_SEARCHES,
+    retry_after=RETRY_AFTER_SECONDS,
+)
+
+profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000)
+slow_requests = SlowRequestLog(size=SLOW_REQUEST_LOG_SIZE, window=SLOW_REQUEST_WINDOW)
+
+# Dedicated pool for CPU-bound query encoding so it never competes with
+# Starlette's default threadpool or blocks the event loop
+encoder_executor = ThreadPoolExecutor(
+    max_workers=ENCODER_WORKERS, thread_name_prefix="encoder"
+)
+dense_batcher = EncodeBatcher(
+    model.encode,
+    encoder_executor,
+    max_batch_size=ENCODE_MAX_BATCH_SIZE,
+    max_wait_ms=ENCODE_MAX_WAIT_MS,
 )
-qdrant_client = QdrantClient(url=QDRANT_URL, timeout=600)
+
+# Pre-rendered response blobs for the default projection, built offline
+# with `python blob_store.py`
+with time_startup("blob_store"):
+    blob_store = BlobStore(BLOB_STORE_PATH) if BLOB_STORE_PATH else None
+
+dense_cache = TTLCache("dense_embedding", maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+sparse_cache = TTLCache("sparse_embedding", maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+# Search results are only valid for the collection state they were computed
+# against. Bumping the generation makes every older entry (and any
+# computation still in flight) unreachable.
+result_cache = TTLCache("search_result", maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+result_flight = SingleFlight("search_result")
+result_cache_generation = 0
+collection_fingerprint = None
+cache_generation_mtime = None
+
+# Loaded on startup when DENSE_BACKEND is "embedded"
+dense_index = None
+dense_index_lock = asyncio.Lock()
 
 # Define Prometheus metrics
 REQUESTS_COUNTER = Counter(
@@ -69,6 +281,12 @@ REQUEST_LATENCY = Histogram(
     buckets=(0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
 )
 
+SEARCH_DEGRADED = Counter(
+    'search_degraded_total',
+    'Searches answered on a lower rung of the degradation ladder',
+    ['query_type', 'reason']
+)
+
 SEARCH_LATENCY = Histogram(
     'search_latency_seconds',
     'Search operation latency in seconds',
@@ -80,6 +298,8 @@ SEARCH_LATENCY = Histogram(
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     start_time = time.time()
+    timings = {}
+    timings_token = request_timings.set(timings)
     
     try:
         response = await call_next(request)
@@ -88,80 +308,340 @@ async def metrics_middleware(request: Request, call_next):
         status_code = 500
         raise e
     finally:
+        request_timings.reset(timings_token)
         end_time = time.time()
         latency = end_time - start_time
         
+        # Label by route template, not the raw path, to keep the label set
+        # bounded
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+
         # Record request metrics
         REQUESTS_COUNTER.labels(
-            endpoint=request.url.path,
+            endpoint=endpoint,
             method=request.method,
             status_code=status_code
         ).inc()
         
         REQUEST_LATENCY.labels(
-            endpoint=request.url.path,
+            endpoint=endpoint,
             method=request.method
         ).observe(latency)
+
+        if not endpoint.startswith("/debug"):
+            slow_requests.record(
+                latency,
+                endpoint=endpoint,
+                method=request.method,
+                query=str(request.query_params),
+                status_code=status_code,
+                stages={stage: round(elapsed * 1000, 1) for stage, elapsed in timings.items()},
+            )
         
+    if timings:
+        timings["total"] = latency
+        response.headers["Server-Timing"] = server_timing(timings)
     return response
 
-def search(query_text: str, query_type: str = "hybrid", limit: int = 5):
-    start_time = time.time()
-    success = True
-    
+async def encode_dense(query_text: str):
+    key = (MODEL_VERSION, normalize_query(query_text))
+    embedding = dense_cache.get(key)
+    if embedding is None:
+        embedding = await dense_batcher.encode(query_text)
+        dense_cache.set(key, embedding)
+    return embedding
+
+
+async def encode_sparse(query_text: str):
+    key = (sparse_key_prefix(), normalize_query(query_text))
+    embedding = sparse_cache.get(key)
+    if embedding is None:
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(encoder_executor, sparse_embed, [query_text])
+        embedding = embeddings[0]
+        sparse_cache.set(key, embedding)
+    return embedding
+
+
+def query_args(plan: SearchPlan, dense_vector, sparse_vector) -> dict:
+    return dict(with_payload=plan.with_payload, **query_vectors(plan, dense_vector, sparse_vector))
+
+
+def query_vectors(plan: SearchPlan, dense_vector, sparse_vector) -> dict:
+    if plan.query_type == "hybrid":
+        return dict(
+            prefetch=[
+                Prefetch(query=dense_vector, using="dense_vector", limit=plan.prefetch_limit),
+                Prefetch(query=SparseVector(**sparse_vector), using="sparse_vector", limit=plan.prefetch_limit),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=plan.fetch_limit,
+        )
+    if plan.query_type == "sparse":
+        return dict(
+            query=SparseVector(**sparse_vector),
+            using="sparse_vector",
+            limit=plan.fetch_limit,
+        )
+    return dict(query=dense_vector, using="dense_vector", limit=plan.fetch_limit)
+
+
+async def encode_query(plan: SearchPlan, query_text: str):
+    async def dense():
+        if not plan.use_dense:
+            return None
+        with time_stage("dense_encode", plan.query_type):
+            return await encode_dense(query_text)
+
+    async def sparse():
+        if not plan.use_sparse:
+            return None
+        with time_stage("sparse_encode", plan.query_type):
+            return await encode_sparse(query_text)
+
+    return await asyncio.gather(dense(), sparse())
+
+
+def dense_encode_budget() -> float:
+    budget = DENSE_ENCODE_BUDGET_MS / 1000
+    remaining = remaining_budget()
+    if remaining is not None:
+        budget = min(budget, remaining * DENSE_ENCODE_BUDGET_FRACTION)
+    return max(budget, 0.0)
+
+
+async def encode_query_within_budget(plan: SearchPlan, query_text: str):
+    """Like encode_query, but gives up on the dense vector past its budget.
+
+    An overrun encode is cancelled rather than left to finish: the budget
+    runs out when the encoders are saturated, and abandoned encodes would
+    only queue up in front of later requests.
+    """
+    deadline = time.monotonic() + dense_encode_budget()
+
+    async def dense():
+        with time_stage("dense_encode", plan.query_type):
+            return await encode_dense(query_text)
+
+    dense_task = asyncio.ensure_future(dense())
+    dense_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
     try:
-        dense_vector = model.encode([query_text])[0]
-        sparse_vector = bm25.raw_embed([query_text])[0]
+        with time_stage("sparse_encode", plan.query_type):
+            sparse_vector = await encode_sparse(query_text)
 
-        prefetch = [
-            Prefetch(query=dense_vector, using="dense_vector", limit=10),
-            Prefetch(query=SparseVector(**sparse_vector), using="sparse_vector", limit=10),
-        ]
+        done, _ = await asyncio.wait({dense_task}, timeout=max(deadline - time.monotonic(), 0))
+        if dense_task in done:
+            return dense_task.result(), sparse_vector
+        return None, sparse_vector
+    finally:
+        dense_task.cancel()
 
-        if query_type == "hybrid":
-            results = qdrant_client.query_points(
-                collection_name=QDRANT_COLLECTION_NAME,
-                prefetch=prefetch,
-                query=FusionQuery(fusion=Fusion.RRF),
-                with_payload=True,
-                limit=30,
-            )
 
-        elif query_type == "sparse":
-            results = qdrant_client.query_points(
-                collection_name=QDRANT_COLLECTION_NAME,
-                query=SparseVector(**sparse_vector),
-                using="sparse_vector",
-                with_payload=True,
-                limit=30,
+def dedup_points(points, limit: int) -> list:
+    unique_titles = set()
+    unique_points = []
+
+    for point in points:
+        title = point.payload.get("title")
+        if title and title not in unique_titles and point.score >= MIN_SCORE:
+            unique_titles.add(title)
+            unique_points.append(point)
+
+            if len(unique_points) >= limit:
+                break
+    return unique_points
+
+
+async def run_search(query_text: str, query_type: str, limit: int, fields: tuple[str, ...] | None):
+    """Returns the de-duplicated points and the degradation applied, if any."""
+    embedded = dense_index is not None and query_type == "dense"
+
+    def make_plan(plan_type: str) -> SearchPlan:
+        return build_plan(
+            plan_type, limit,
+            overfetch_factor=OVERFETCH_FACTOR, prefetch_factor=PREFETCH_FACTOR, fields=fields,
+            group_by=DEDUP_GROUP_KEY if DEDUP_MODE == "group" and not embedded else None,
+        )
+
+    plan = make_plan(query_type)
+    degraded = None
+    check_deadline()
+    if plan.query_type == "hybrid" and DEGRADE_HYBRID:
+        dense_vector, sparse_vector = await encode_query_within_budget(plan, query_text)
+        if dense_vector is None:
+            degraded = "sparse-only"
+            SEARCH_DEGRADED.labels(query_type=query_type, reason="dense_encode_budget").inc()
+            plan = make_plan("sparse")
+    else:
+        dense_vector, sparse_vector = await encode_query(plan, query_text)
+
+    check_deadline()
+    if embedded:
+        loop = asyncio.get_running_loop()
+        with time_stage("dense_index", query_type):
+            points = await loop.run_in_executor(
+                encoder_executor, dense_index.search, dense_vector, plan.fetch_limit, plan.fields
             )
+        with time_stage("postprocess", query_type):
+            return dedup_points(points, limit), degraded
 
-        elif query_type == "dense":
-            results = qdrant_client.query_points(
+    if plan.group_by:
+        with time_stage("qdrant", query_type):
+            results = await qdrant_client.query_points_groups(
                 collection_name=QDRANT_COLLECTION_NAME,
-                query=dense_vector,
-                using="dense_vector",
-                with_payload=True,
-                limit=30,
+                group_by=plan.group_by,
+                group_size=1,
+                score_threshold=MIN_SCORE,
+                timeout=remaining_timeout(),
+                **query_args(plan, dense_vector, sparse_vector),
             )
+        return [group.hits[0] for group in results.groups], degraded
 
-        unique_titles = set()
-        unique_products = []
-
-        for points in results.points:
-            title = points.payload.get("title")
-            if title and title not in unique_titles and points.score >= 0.4:
-                unique_titles.add(title)
-                unique_products.append(points.payload)
-
-                if len(unique_products) >= limit:
-                    break
-        return unique_products
-        # response_data = [
-        #     {"score": point.score, "payload": point.payload} for point in results.points
-        # ]
-        
-    except Exception as e:
+    with time_stage("qdrant", query_type):
+        results = await qdrant_client.query_points(
+            collection_name=QDRANT_COLLECTION_NAME,
+            timeout=remaining_timeout(),
+            **query_args(plan, dense_vector, sparse_vector),
+        )
+
+    with time_stage("postprocess", query_type):
+        return dedup_points(results.points, limit), degraded
+
+
+def invalidate_result_cache():
+    global result_cache_generation
+    result_cache_generation += 1
+    result_cache.clear()
+    if blob_store is not None:
+        blob_store.reload()
+    load_corpus_stats()
+
+
+def cache_generation_file_mtime() -> float | None:
+    if not CACHE_GENERATION_FILE:
+        return None
+    try:
+        return os.path.getmtime(CACHE_GENERATION_FILE)
+    except FileNotFoundError:
+        return None
+
+
+def publish_cache_generation():
+    """Tell the other workers sharing CACHE_GENERATION_FILE to invalidate."""
+    global cache_generation_mtime
+    if not CACHE_GENERATION_FILE:
+        return
+    with open(CACHE_GENERATION_FILE, "w") as f:
+        f.write(str(time.time()))
+    # This worker is already up to date
+    cache_generation_mtime = cache_generation_file_mtime()
+
+
+def load_dense_index(stale_before: float | None = None, expected_count: int | None = None) -> DenseIndex:
+    """Load the snapshot, rebuilding it first if it is missing, was started
+    before `stale_before` or does not hold `expected_count` points.
+
+    Workers under prefork.py share DENSE_INDEX_PATH. The build lock lets
+    one of them rebuild; the others wait, find a snapshot started after
+    the change they saw and only reload it.
+    """
+    with locked(DENSE_INDEX_PATH, BUILD_LOCK):
+        meta = read_meta(DENSE_INDEX_PATH)
+        if (
+            meta is None
+            or meta.get("version") != SNAPSHOT_VERSION
+            or (stale_before is not None and meta.get("started_at", meta["built_at"]) < stale_before)
+            or (expected_count is not None and meta["count"] != expected_count)
+        ):
+            client = QdrantClient(url=QDRANT_URL, **client_options(
+                QDRANT_TRANSPORT, 600, 1, QDRANT_KEEPALIVE_SECONDS, QDRANT_GRPC_PORT
+            ))
+            try:
+                snapshot_dense_index(client, QDRANT_COLLECTION_NAME, DENSE_INDEX_PATH)
+            finally:
+                client.close()
+    return DenseIndex(DENSE_INDEX_PATH)
+
+
+async def refresh_dense_index(stale_before: float | None = None):
+    """Rebuild the snapshot unless one was started after `stale_before`
+    (default: now), then load it."""
+    global dense_index
+    stale_before = time.time() if stale_before is None else stale_before
+    async with dense_index_lock:
+        loop = asyncio.get_running_loop()
+        dense_index = await loop.run_in_executor(None, load_dense_index, stale_before)
+
+
+async def reload_dense_index():
+    global dense_index
+    async with dense_index_lock:
+        loop = asyncio.get_running_loop()
+        dense_index = await loop.run_in_executor(None, DenseIndex, DENSE_INDEX_PATH)
+
+
+async def watch_collection():
+    # Qdrant exposes no change counter, so treat any movement in the point
+    # or indexed vector counts as an index update. Indexers that rewrite
+    # points in place should call POST /cache/invalidate (with the debug
+    # token) instead.
+    global collection_fingerprint, cache_generation_mtime
+    # The change was made after the last check that saw the old fingerprint,
+    # so any snapshot started after that check already holds it
+    checked_at = time.time()
+    while True:
+        try:
+            now = time.time()
+            info = await qdrant_client.get_collection(QDRANT_COLLECTION_NAME)
+            fingerprint = (info.points_count, info.indexed_vectors_count)
+            if collection_fingerprint is not None and fingerprint != collection_fingerprint:
+                if dense_index is not None:
+                    await refresh_dense_index(stale_before=checked_at)
+                invalidate_result_cache()
+            elif dense_index is not None:
+                # Rebuilt by another worker or by `python dense_index.py`
+                meta = read_meta(DENSE_INDEX_PATH)
+                if meta is not None and meta["built_at"] != dense_index.built_at:
+                    await reload_dense_index()
+                    invalidate_result_cache()
+            # POST /cache/invalidate served by another worker
+            mtime = cache_generation_file_mtime()
+            if mtime != cache_generation_mtime:
+                cache_generation_mtime = mtime
+                invalidate_result_cache()
+            collection_fingerprint = fingerprint
+            checked_at = now
+        except Exception as e:
+            logging.getLogger("uvicorn.error").warning(f"Collection check failed: {str(e)}")
+        await asyncio.sleep(RESULT_CACHE_CHECK_INTERVAL)
+
+
+async def search(
+    query_text: str,
+    query_type: str = "hybrid",
+    limit: int = 5,
+    fields: tuple[str, ...] | None = None,
+):
+    start_time = time.time()
+    success = True
+
+    try:
+        key = (result_cache_generation, normalize_query(query_text), query_type, limit, fields)
+        unique_points = result_cache.get(key)
+        if unique_points is not None:
+            return unique_points, None
+
+        unique_points, degraded = await result_flight.do(
+            key, lambda: run_search(query_text, query_type, limit, fields)
+        )
+        # Degraded answers are served but never cached
+        if degraded is None:
+            result_cache.set(key, unique_points)
+        return unique_points, degraded
+
+    except (Exception, asyncio.CancelledError) as e:
         success = False
         raise e
     finally:
@@ -176,33 +656,342 @@ def search(query_text: str, query_type: str = "hybrid", limit: int = 5):
     return response_data
 
 
+class SearchRequest(BaseModel):
+    query: str
+    query_type: str = "dense"
+    limit: int = 5
+    fields: str | None = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[SearchRequest]
+
+
+def clamp_limit(limit: int) -> int:
+    return max(5, min(limit, 20))
+
+
+async def encode_batch(texts: list[str], encode_fn, cache: TTLCache, key_prefix) -> dict:
+    # One encoder call for every text not already cached
+    embeddings = {}
+    missing = []
+    for text in texts:
+        key = (key_prefix, normalize_query(text))
+        embedding = cache.get(key)
+        if embedding is None:
+            missing.append(text)
+        else:
+            embeddings[text] = embedding
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        encoded = await loop.run_in_executor(encoder_executor, encode_fn, missing)
+        for text, embedding in zip(missing, encoded):
+            cache.set((key_prefix, normalize_query(text)), embedding)
+            embeddings[text] = embedding
+    return embeddings
+
+
+async def run_batch_search(plans: dict[tuple, SearchPlan]) -> dict[tuple, list]:
+    dense_texts = list({key[1] for key, plan in plans.items() if plan.use_dense})
+    sparse_texts = list({key[1] for key, plan in plans.items() if plan.use_sparse})
+
+    check_deadline()
+    with time_stage("dense_encode", "batch"):
+        dense_vectors = await encode_batch(dense_texts, model.encode, dense_cache, MODEL_VERSION)
+    check_deadline()
+    with time_stage("sparse_encode", "batch"):
+        sparse_vectors = await encode_batch(sparse_texts, sparse_embed, sparse_cache, sparse_key_prefix())
+
+    keys = list(plans)
+    requests = []
+    for key in keys:
+        text = key[1]
+        plan = plans[key]
+        dense_vector = dense_vectors.get(text) if plan.use_dense else None
+        if dense_vector is not None:
+            dense_vector = dense_vector.tolist()
+        requests.append(QueryRequest(**query_args(plan, dense_vector, sparse_vectors.get(text))))
+
+    check_deadline()
+    with time_stage("qdrant", "batch"):
+        responses = await qdrant_client.query_batch_points(
+            collection_name=QDRANT_COLLECTION_NAME,
+            requests=requests,
+            timeout=remaining_timeout(),
+        )
+
+    with time_stage("postprocess", "batch"):
+        return {
+            key: dedup_points(response.points, plans[key].limit)
+            for key, response in zip(keys, responses)
+        }
+
+
+def request_budget(request: Request) -> float:
+    # Callers may ask for a tighter budget, never a looser one
+    budget = SEARCH_DEADLINE_SECONDS
+    header = request.headers.get("x-request-timeout")
+    if header:
+        try:
+            budget = min(budget, max(float(header), 0.0))
+        except ValueError:
+            pass
+    return budget
+
+
+async def within_deadline(awaitable):
+    remaining = remaining_budget()
+    if remaining is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, max(remaining, 0.001))
+
+
+async def ndjson_lines(products: list[dict]):
+    for product in products:
+        yield json.dumps(product, ensure_ascii=False, default=str) + "\n"
+
+
 @app.get("/products")
-def search_product(query: str = None, query_type="dense", limit: int = 5):
+async def search_product(
+    request: Request,
+    query: str = None,
+    query_type="dense",
+    limit: int = 5,
+    fields: str = None,
+):
     if query is None or len(query) == 0:
         SEARCH_COUNTER.labels(query_type=query_type, status="error").inc()
         raise HTTPException(status_code=400, detail="Query is required")
     
-    if query_type not in ["hybrid", "sparse", "dense"]:
+    if query_type not in QUERY_TYPES:
         SEARCH_COUNTER.labels(query_type=query_type, status="error").inc()
         raise HTTPException(status_code=400, detail="Query type invalid")
 
-    limit = max(5, min(limit, 20))
+    limit = clamp_limit(limit)
+    fields = parse_fields(fields, DEFAULT_FIELDS)
+    stream = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    deadline = time.monotonic() + request_budget(request)
+
+    try:
+        async with search_admission.admit(deadline):
+            return await answer_search(query, query_type, limit, fields, stream)
+    except Overloaded as e:
+        SEARCH_COUNTER.labels(query_type=query_type, status="shed").inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Search service overloaded",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
 
+async def answer_search(
+    query: str,
+    query_type: str,
+    limit: int,
+    fields: tuple[str, ...] | None,
+    stream: bool,
+):
     try:
-        query_res = search(query_text=query, query_type=query_type, limit=limit)
-        logger.info("Search query", extra={
-            "search_query": query,
-            "results": query_res,
-        })
-        return query_res
+        body = None
+        if blob_store is not None and not stream and fields == blob_store.fields:
+            # Titles are all de-duplication needs; the response body comes
+            # straight from the pre-rendered blobs
+            points, degraded = await within_deadline(
+                search(query_text=query, query_type=query_type, limit=limit, fields=("title",))
+            )
+            with time_stage("serialize", query_type):
+                body = blob_store.render([point.id for point in points])
+        if body is None:
+            points, degraded = await within_deadline(
+                search(query_text=query, query_type=query_type, limit=limit, fields=fields)
+            )
+
+        query_res = [point.payload for point in points]
+        # Only enqueues; the shipper thread does the I/O
+        logger.info(
+            "Search query",
+            extra={
+                "search_query": query,
+                "query_type": query_type,
+                "limit": limit,
+                "results": [{"id": point.id, "score": point.score} for point in points],
+            },
+        )
+        headers = {"X-Search-Degraded": degraded} if degraded else {}
+        if body is not None:
+            return Response(body, media_type="application/json", headers=headers)
+        # Opt-in streaming: one product per line, serialized as it is sent
+        if stream:
+            return StreamingResponse(ndjson_lines(query_res), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        with time_stage("serialize", query_type):
+            return JSONResponse(query_res, headers=headers)
+    except asyncio.TimeoutError:
+        SEARCH_COUNTER.labels(query_type=query_type, status="timeout").inc()
+        raise HTTPException(status_code=504, detail="Search deadline exceeded")
     except Exception as e:
         SEARCH_COUNTER.labels(query_type=query_type, status="error").inc()
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
+@app.post("/products/batch")
+async def search_product_batch(request: Request, body: BatchSearchRequest):
+    if len(body.queries) == 0 or len(body.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Between 1 and {MAX_BATCH_QUERIES} queries are required",
+        )
+
+    for item in body.queries:
+        if len(item.query) == 0:
+            raise HTTPException(status_code=400, detail="Query is required")
+        if item.query_type not in QUERY_TYPES:
+            raise HTTPException(status_code=400, detail="Query type invalid")
+
+    generation = result_cache_generation
+    keys = []
+    results = {}
+    plans = {}
+    for item in body.queries:
+        limit = clamp_limit(item.limit)
+        fields = parse_fields(item.fields, DEFAULT_FIELDS)
+        key = (generation, normalize_query(item.query), item.query_type, limit, fields)
+        keys.append(key)
+        if key in results or key in plans:
+            continue
+
+        cached = result_cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            plans[key] = build_plan(
+                item.query_type, limit,
+                overfetch_factor=OVERFETCH_FACTOR, prefetch_factor=PREFETCH_FACTOR, fields=fields,
+            )
+
+    try:
+        if plans:
+            # The whole batch takes a single admission slot
+            async with search_admission.admit(time.monotonic() + request_budget(request)):
+                computed = await within_deadline(run_batch_search(plans))
+            for key, unique_points in computed.items():
+                result_cache.set(key, unique_points)
+            results.update(computed)
+    except Overloaded as e:
+        for key in keys:
+            SEARCH_COUNTER.labels(query_type=key[2], status="shed").inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Search service overloaded",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except asyncio.TimeoutError:
+        for key in keys:
+            SEARCH_COUNTER.labels(query_type=key[2], status="timeout").inc()
+        raise HTTPException(status_code=504, detail="Search deadline exceeded")
+    except Exception as e:
+        for key in keys:
+            SEARCH_COUNTER.labels(query_type=key[2], status="error").inc()
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+    # Per-query latency is not meaningful inside a batch; the request
+    # histogram covers /products/batch as a whole
+    for key in keys:
+        SEARCH_COUNTER.labels(query_type=key[2], status="success").inc()
+
+    return [[point.payload for point in results[key]] for key in keys]
+
+@app.on_event("startup")
+async def startup_event():
+    global dense_index
+    loki_handler.start()
+    dense_batcher.start()
+    if ENCODER_BACKEND == "onnx":
+        # Opened here rather than at import, so every prefork.py worker gets
+        # its own session after the fork
+        with time_startup("onnx_session"):
+            await asyncio.get_running_loop().run_in_executor(None, model.open)
+    if DENSE_BACKEND == "embedded":
+        loop = asyncio.get_running_loop()
+        # A snapshot left over from an earlier run may predate the last
+        # indexing run. points_count from get_collection is approximate,
+        # so compare against an exact count
+        count = await qdrant_client.count(QDRANT_COLLECTION_NAME, exact=True)
+        with time_startup("dense_index"):
+            dense_index = await loop.run_in_executor(None, load_dense_index, None, count.count)
+    app.state.collection_watcher = asyncio.create_task(watch_collection())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.collection_watcher.cancel()
+    await dense_batcher.stop()
+    await qdrant_client.close()
+    encoder_executor.shutdown(wait=False)
+    loki_handler.close()
+
+def require_debug_token(request: Request):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("X-Debug-Token", ""), DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: Request):
+    # Indexers call this after rewriting points in place, which the
+    # embedded snapshot would not otherwise see. Flushing the caches and
+    # rebuilding the snapshot are both expensive, so it needs the token
+    require_debug_token(request)
+    if dense_index is not None:
+        await refresh_dense_index()
+    invalidate_result_cache()
+    publish_cache_generation()
+    return {"status": "invalidated", "generation": result_cache_generation}
+
+@app.post("/dense-index/refresh")
+async def refresh_dense_index_endpoint(request: Request):
+    # Rebuilding scrolls the whole collection, so it is guarded like /debug
+    require_debug_token(request)
+    if dense_index is None:
+        raise HTTPException(status_code=409, detail="Embedded dense backend is not enabled")
+    await refresh_dense_index()
+    invalidate_result_cache()
+    return {"status": "refreshed", "points": len(dense_index)}
+
 @app.get("/metrics")
 def metrics():
+    # Under prefork.py every worker writes its own files; merge them here
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10, format: str = "collapsed"):
+    require_debug_token(request)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS}]")
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be collapsed or speedscope")
+
+    try:
+        # The sampler runs on its own thread so the event loop being
+        # profiled keeps serving
+        profile = await asyncio.to_thread(profiler.run, seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "speedscope":
+        return JSONResponse(
+            to_speedscope(profile),
+            headers={"Content-Disposition": 'attachment; filename="search_api.speedscope.json"'},
+        )
+    return Response(to_collapsed(profile), media_type="text/plain")
+
+@app.get("/debug/slow-requests")
+def debug_slow_requests(request: Request):
+    require_debug_token(request)
+    return slow_requests.top()
+
 # Health check endpoint for monitoring
 @app.get("/health")
 def health_check():
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+CONFIG_FILE = "onnx_config.json"
+
+
+def export(model_dir: str, out_dir: str, opset: int = 17) -> str:
+    """Export a sentence-transformers model to ONNX and quantize it to int8.
+
+    Only the transformer runs in ONNX Runtime; pooling and normalisation are
+    read from the sentence-transformers module config and applied in NumPy.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModel.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(["onnx export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask"]
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(out_dir, INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(out_dir)
+
+    pooling_mode = "mean"
+    pooling_config = os.path.join(model_dir, "1_Pooling", "config.json")
+    if os.path.exists(pooling_config):
+        with open(pooling_config, "r") as f:
+            pooling = json.load(f)
+        if pooling.get("pooling_mode_cls_token"):
+            pooling_mode = "cls"
+        elif pooling.get("pooling_mode_max_tokens"):
+            pooling_mode = "max"
+
+    max_seq_length = 512
+    st_config = os.path.join(model_dir, "sentence_bert_config.json")
+    if os.path.exists(st_config):
+        with open(st_config, "r") as f:
+            max_seq_length = json.load(f).get("max_seq_length", max_seq_length)
+
+    with open(os.path.join(out_dir, CONFIG_FILE), "w") as f:
+        json.dump({
+            "source": os.path.abspath(model_dir),
+            "pooling_mode": pooling_mode,
+            "normalize": os.path.isdir(os.path.join(model_dir, "2_Normalize")),
+            "max_seq_length": max_seq_length,
+            "input_names": input_names,
+        }, f, indent=2)
+
+    for name in ("sentence_bert_config.json", "modules.json"):
+        if os.path.exists(os.path.join(model_dir, name)):
+            shutil.copy(os.path.join(model_dir, name), out_dir)
+    return out_dir
+
+
+class OnnxEncoder:
+    """Drop-in replacement for SentenceTransformer.encode on ONNX Runtime.
+
+    The session is opened on first use (or by open()) in the process that
+    runs it. ONNX Runtime sessions are not fork-safe, so a process forked
+    from one that already had a session, like a prefork.py worker, opens
+    its own.
+    """
+
+    def __init__(self, path: str, int8: bool = True, threads: int | None = None):
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(path, CONFIG_FILE), "r") as f:
+            self.config = json.load(f)
+
+        self.model_path = os.path.join(path, INT8_FILE if int8 else FP32_FILE)
+        self.threads = threads
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        self._session = None
+        self._session_pid = None
+
+    def open(self):
+        import onnxruntime as ort
+
+        if self._session is not None and self._session_pid == os.getpid():
+            return self._session
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+
+        session = ort.InferenceSession(self.model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in session.get_inputs()}
+        self._session, self._session_pid = session, os.getpid()
+        return session
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.config["pooling_mode"]
+        if mode == "cls":
+            return hidden[:, 0]
+        if mode == "max":
+            return np.where(mask[..., None] > 0, hidden, -1e9).max(axis=1)
+        mask = mask[..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences: list[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        session = self.open()
+        embeddings = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.config["max_seq_length"],
+                return_tensors="np",
+            )
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = session.run(None, feed)[0]
+            embeddings.append(self._pool(hidden, tokens["attention_mask"]))
+
+        embeddings = np.concatenate(embeddings).astype(np.float32)
+        if self.config["normalize"]:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+
+def parity(reference, candidate, queries: list[str]) -> dict:
+    """Cosine similarity between two encoders' embeddings of `queries`."""
+    expected = np.asarray(reference.encode(queries), dtype=np.float32)
+    actual = np.asarray(candidate.encode(queries), dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    actual /= np.linalg.norm(actual, axis=1, keepdims=True)
+    similarity = (expected * actual).sum(axis=1)
+    return {
+        "queries": len(queries),
+        "min_cosine": float(similarity.min()),
+        "mean_cosine": float(similarity.mean()),
+        "worst_query": queries[int(similarity.argmin())],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and check the ONNX query encoder")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("--model", default="./ml_model")
+    export_parser.add_argument("--out", default=os.environ.get("ONNX_MODEL_PATH", "./ml_model_onnx"))
+
+    check_parser = subparsers.add_parser("check")
+    check_parser.add_argument("--model", default="./ml_model")
+    check_parser.add_argument("--onnx", default=os.environ.get("ONNX_MODEL_PATH", "./ml_model_onnx"))
+    check_parser.add_argument("--queries", default=None, help="Text file with one query per line")
+    check_parser.add_argument("--min-cosine", type=float, default=0.99)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported to {export(args.model, args.out)}")
+    else:
+        from sentence_transformers import SentenceTransformer
+        from benchmarks.common import SAMPLE_QUERIES
+
+        queries = SAMPLE_QUERIES
+        if args.queries:
+            with open(args.queries, "r") as f:
+                queries = [line.strip() for line in f if line.strip()]
+
+        result = parity(SentenceTransformer(args.model), OnnxEncoder(args.onnx), queries)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if result["min_cosine"] < args.min_cosine:
+            raise SystemExit(f"Parity check failed: min cosine {result['min_cosine']:.4f} < {args.min_cosine}")
@@ -0,0 +1,75 @@
+import math
+from dataclasses import dataclass
+
+
+QUERY_TYPES = ("hybrid", "sparse", "dense")
+
+# Slim projection for list views; the nested description, specification
+# and gallery payloads are only sent when explicitly requested
+DEFAULT_FIELDS = "title,price,currency,brand,category,main_image,product_url,product_code"
+
+# The depth every search used before it scaled with `limit`; small limits
+# still fetch this many so de-duplication has enough candidates
+MIN_FETCH_LIMIT = 30
+
+
+@dataclass(frozen=True)
+class SearchPlan:
+    query_type: str
+    limit: int
+    use_dense: bool
+    use_sparse: bool
+    prefetch_limit: int
+    fetch_limit: int
+    fields: tuple[str, ...] | None = None
+    group_by: str | None = None
+
+    @property
+    def with_payload(self) -> bool | list[str]:
+        return list(self.fields) if self.fields is not None else True
+
+
+def build_plan(
+    query_type: str,
+    limit: int,
+    overfetch_factor: float = 3.0,
+    prefetch_factor: float = 2.0,
+    fields: tuple[str, ...] | None = None,
+    group_by: str | None = None,
+    min_fetch_limit: int = MIN_FETCH_LIMIT,
+) -> SearchPlan:
+    """Decide which encoders a search needs and how deep to query Qdrant.
+
+    `fetch_limit` is how many points are pulled back to survive title
+    de-duplication and score thresholding; `prefetch_limit` is the depth of
+    each arm of a hybrid query. Both scale with the requested `limit`, and
+    `fetch_limit` is never below `min_fetch_limit`.
+    `fields` restricts the payload keys Qdrant returns; None means all.
+    With `group_by`, Qdrant de-duplicates on that payload key itself and
+    exactly `limit` points are fetched.
+    """
+    if query_type not in QUERY_TYPES:
+        raise ValueError(f"Unknown query type: {query_type}")
+
+    return SearchPlan(
+        query_type=query_type,
+        limit=limit,
+        use_dense=query_type in ("hybrid", "dense"),
+        use_sparse=query_type in ("hybrid", "sparse"),
+        prefetch_limit=math.ceil(limit * prefetch_factor) if query_type == "hybrid" else 0,
+        fetch_limit=limit if group_by else max(min_fetch_limit, math.ceil(limit * overfetch_factor)),
+        fields=fields,
+        group_by=group_by,
+    )
+
+
+def parse_fields(fields: str | None, default: str = DEFAULT_FIELDS) -> tuple[str, ...] | None:
+    # "*" asks for the full payload; the title is always kept because
+    # de-duplication needs it
+    if fields is None or len(fields.strip()) == 0:
+        fields = default
+    if fields.strip() == "*":
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    names.add("title")
+    return tuple(sorted(names))
@@ -0,0 +1,141 @@
+"""Pre-fork launcher for the search service.
+
+The master imports `main`, which loads the sentence-transformers model,
+the BM25 stopwords and tokenizer, then forks WEB_WORKERS uvicorn workers
+that share those pages copy-on-write and accept on one listening socket.
+With DENSE_BACKEND=embedded the workers share one snapshot directory; a
+lock in it makes sure only one of them rebuilds the snapshot, and the
+others reload it.
+
+    WEB_WORKERS=4 python prefork.py
+"""
+import gc
+import logging.config
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+import uvicorn
+
+
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 1))
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 8000))
+BACKLOG = int(os.environ.get("BACKLOG", 2048))
+
+
+def bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_threads() -> int:
+    # Split the cores between workers instead of every worker's intra-op
+    # pool trying to use all of them
+    return max(1, (os.cpu_count() or 1) // WEB_WORKERS)
+
+
+def run_worker(app, sock: socket.socket):
+    try:
+        import torch
+        torch.set_num_threads(worker_threads())
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(app, host=HOST, port=PORT, lifespan="on")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def main():
+    # Workers share one registry directory, so /metrics aggregates them
+    if WEB_WORKERS > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    # POST /cache/invalidate reaches one worker; the rest watch this file
+    if WEB_WORKERS > 1 and "CACHE_GENERATION_FILE" not in os.environ:
+        os.environ["CACHE_GENERATION_FILE"] = os.path.join(tempfile.mkdtemp(prefix="search-cache-"), "generation")
+    # Read by main when it builds the ONNX encoder
+    os.environ.setdefault("ENCODER_THREADS", str(worker_threads()))
+
+    # uvicorn only sets up its loggers once a worker builds its Config;
+    # without this the master's import-time lines (time_startup's
+    # "Loaded ... in ...s") go nowhere
+    logging.config.dictConfig(uvicorn.config.LOGGING_CONFIG)
+
+    import main as service
+
+    # Everything allocated so far (model weights, tokenizer, stopwords, ...)
+    # goes to the permanent generation. The cyclic GC then never walks
+    # those objects in a worker, so it never writes to their pages and
+    # never unshares them. Tensor storage lives outside the PyObject
+    # headers, so ordinary refcount updates only touch the small object
+    # pages, not the weights.
+    gc.disable()
+    gc.freeze()
+
+    sock = bind_socket()
+    workers: dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            code = 0
+            try:
+                run_worker(service.app, sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            # Never fall back into the master's loop
+            os._exit(code)
+        workers[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(WEB_WORKERS):
+        spawn(index)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        index = workers.pop(pid, None)
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid)
+
+        if not stopping and index is not None:
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr)
+            time.sleep(1)
+            spawn(index)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    """Statistical profiler over every thread of the process.
+
+    A sampler thread wakes every `interval` seconds and records the Python
+    stack of all other threads with sys._current_frames(). Overhead is
+    bounded by the interval and the stack depth, not by the request rate,
+    and only one profile runs at a time.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def _stack(self, frame) -> tuple[tuple[str, str, int], ...]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def run(self, seconds: float) -> dict:
+        """Sample for `seconds`; raises ProfilerBusy if a profile is running."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            own_ident = threading.get_ident()
+            samples: dict[str, Counter] = {}
+            start_time = time.perf_counter()
+            deadline = start_time + seconds
+            next_tick = start_time
+            while True:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    thread = names.get(ident, str(ident))
+                    samples.setdefault(thread, Counter())[self._stack(frame)] += 1
+
+                next_tick += self.interval
+                now = time.perf_counter()
+                if next_tick >= deadline:
+                    break
+                # Never catch up with a burst of samples after a stall
+                next_tick = max(next_tick, now)
+                time.sleep(next_tick - now)
+            return {
+                "interval": self.interval,
+                "duration": time.perf_counter() - start_time,
+                "samples": samples,
+            }
+        finally:
+            self._lock.release()
+
+
+def _frame_name(frame: tuple[str, str, int]) -> str:
+    name, filename, line = frame
+    return f"{name} ({filename}:{line})"
+
+
+def to_collapsed(profile: dict) -> str:
+    """Brendan Gregg's folded format: `thread;outer;...;inner count` per line."""
+    lines = []
+    for thread, stacks in profile["samples"].items():
+        for stack, count in stacks.most_common():
+            frames = ";".join(_frame_name(frame) for frame in stack)
+            lines.append(f"{thread};{frames} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profile: dict, name: str = "search_api") -> dict:
+    """One sampled profile per thread, identical stacks merged by weight."""
+    frame_index: dict[tuple[str, str, int], int] = {}
+    frames = []
+    profiles = []
+    for thread, stacks in profile["samples"].items():
+        thread_samples = []
+        weights = []
+        for stack, count in stacks.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            thread_samples.append(indexes)
+            weights.append(count * profile["interval"])
+        profiles.append({
+            "type": "sampled",
+            "name": thread,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": thread_samples,
+            "weights": weights,
+        })
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "search_api",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+class SlowRequestLog:
+    """The `size` slowest requests seen in the last `window` seconds.
+
+    A min-heap keyed on latency, so recording a request costs O(size) at
+    worst. Not thread-safe: it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, size: int = 20, window: float = 300.0):
+        self.size = size
+        self.window = window
+        self._heap: list[tuple[float, int, dict]] = []
+        self._sequence = 0
+
+    def _expire(self, now: float):
+        if any(entry["at"] < now - self.window for _, _, entry in self._heap):
+            self._heap = [item for item in self._heap if item[2]["at"] >= now - self.window]
+            heapq.heapify(self._heap)
+
+    def record(self, latency: float, **details):
+        if self.size <= 0:
+            return
+
+        now = time.time()
+        self._expire(now)
+        self._sequence += 1
+        item = (latency, self._sequence, {"at": now, "latency": latency, **details})
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        elif latency > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def top(self) -> list[dict]:
+        self._expire(time.time())
+        return [entry for _, _, entry in sorted(self._heap, reverse=True)]
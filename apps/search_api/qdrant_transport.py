@@ -0,0 +1,89 @@
+import itertools
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+
+
+TRANSPORTS = ("rest", "grpc")
+
+
+def grpc_options(keepalive_seconds: float) -> dict:
+    # Ping idle channels so a load balancer or NAT never silently drops
+    # them between bursts
+    return {
+        "grpc.keepalive_time_ms": int(keepalive_seconds * 1000),
+        "grpc.keepalive_timeout_ms": 10000,
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.http2.max_pings_without_data": 0,
+        "grpc.max_receive_message_length": 64 * 1024 * 1024,
+    }
+
+
+def client_options(
+    transport: str,
+    timeout: int,
+    max_connections: int,
+    keepalive_seconds: float,
+    grpc_port: int = 6334,
+) -> dict:
+    """Keyword arguments for QdrantClient/AsyncQdrantClient."""
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown Qdrant transport {transport!r}, expected one of {TRANSPORTS}")
+    if transport == "grpc":
+        return dict(
+            prefer_grpc=True,
+            grpc_port=grpc_port,
+            timeout=timeout,
+            grpc_options=grpc_options(keepalive_seconds),
+        )
+    # qdrant-client turns keep-alive off for local REST servers unless
+    # limits are passed explicitly
+    return dict(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_seconds,
+        ),
+    )
+
+
+class QdrantClientPool:
+    """Round-robin over several clients, each with its own connection.
+
+    One gRPC channel is a single HTTP/2 connection, so under many
+    concurrent searches its streams share one socket and one decoding
+    thread. Attribute access picks the next client, so the pool is a
+    drop-in replacement for a single AsyncQdrantClient.
+    """
+
+    def __init__(self, clients: list[AsyncQdrantClient]):
+        self.clients = clients
+        self._next = itertools.cycle(clients)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __getattr__(self, name: str):
+        return getattr(next(self._next), name)
+
+    async def close(self, **kwargs):
+        for client in self.clients:
+            await client.close(**kwargs)
+
+
+def connect(
+    url: str,
+    transport: str = "rest",
+    pool_size: int = 1,
+    timeout: int = 10,
+    max_connections: int = 32,
+    keepalive_seconds: float = 30.0,
+    grpc_port: int = 6334,
+) -> AsyncQdrantClient | QdrantClientPool:
+    # The connection budget is shared by the whole pool
+    per_client = max(1, -(-max_connections // max(pool_size, 1)))
+    options = client_options(transport, timeout, per_client, keepalive_seconds, grpc_port)
+    if pool_size <= 1:
+        return AsyncQdrantClient(url=url, **options)
+    return QdrantClientPool([AsyncQdrantClient(url=url, **options) for _ in range(pool_size)])
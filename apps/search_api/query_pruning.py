@@ -0,0 +1,72 @@
+import numpy as np
+from prometheus_client import Counter
+
+
+SPARSE_QUERY_TERMS = Counter(
+    'sparse_query_terms_total',
+    'Sparse query terms after IDF pruning, by outcome',
+    ['outcome']
+)
+
+
+class QueryPruner:
+    """Drops or down-weights low-information terms of a BM25 query vector.
+
+    A term is pruned when its IDF is below `min_idf`, or when it falls
+    outside the highest-weighted terms (weight = query value * IDF) that
+    together carry `keep_weight` of the query's total weight. Common
+    subword tokens have the longest posting lists and move the ranking
+    least, so they go first. The highest-weighted term is always kept.
+
+    Pruned terms are removed when `pruned_weight` is 0, otherwise their
+    values are scaled by it.
+    """
+
+    def __init__(self, idf: np.ndarray, min_idf: float = 0.0, keep_weight: float = 1.0, pruned_weight: float = 0.0):
+        self.idf = idf
+        self.max_idf = float(idf.max()) if len(idf) else 0.0
+        self.min_idf = min_idf
+        self.keep_weight = keep_weight
+        self.pruned_weight = pruned_weight
+
+    def _idf(self, indices: np.ndarray) -> np.ndarray:
+        # Tokens past the end of the table never occurred in the corpus
+        known = indices < len(self.idf)
+        idf = np.full(len(indices), self.max_idf, dtype=np.float64)
+        idf[known] = self.idf[indices[known]]
+        return idf
+
+    def prune(self, sparse_vector: dict) -> dict:
+        if len(sparse_vector["indices"]) <= 1:
+            SPARSE_QUERY_TERMS.labels(outcome="kept").inc(len(sparse_vector["indices"]))
+            return sparse_vector
+
+        indices = np.asarray(sparse_vector["indices"], dtype=np.int64)
+        values = np.asarray(sparse_vector["values"], dtype=np.float64)
+        idf = self._idf(indices)
+        weights = values * idf
+
+        keep = idf >= self.min_idf
+        if self.keep_weight < 1.0:
+            order = np.argsort(-weights, kind="stable")
+            cumulative = np.cumsum(weights[order])
+            # Smallest prefix that reaches the target share of the weight
+            count = int(np.searchsorted(cumulative, self.keep_weight * cumulative[-1])) + 1
+            by_weight = np.zeros(len(indices), dtype=bool)
+            by_weight[order[:count]] = True
+            keep &= by_weight
+        keep[int(np.argmax(weights))] = True
+
+        kept = int(keep.sum())
+        SPARSE_QUERY_TERMS.labels(outcome="kept").inc(kept)
+        if kept == len(indices):
+            return sparse_vector
+
+        if self.pruned_weight > 0:
+            SPARSE_QUERY_TERMS.labels(outcome="downweighted").inc(len(indices) - kept)
+            values = np.where(keep, values, values * self.pruned_weight)
+            return {"values": values.tolist(), "indices": sparse_vector["indices"]}
+
+        SPARSE_QUERY_TERMS.labels(outcome="dropped").inc(len(indices) - kept)
+        # Original order is kept, so equal queries prune to equal vectors
+        return {"values": values[keep].tolist(), "indices": indices[keep].tolist()}
@@ -0,0 +1,29 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batcher import EncodeBatcher
+
+
+def test_cancelled_entries_are_not_encoded():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        time.sleep(0.05)
+        return texts
+
+    async def run():
+        batcher = EncodeBatcher(encode, ThreadPoolExecutor(1), max_batch_size=1)
+        batcher.start()
+        tasks = [asyncio.ensure_future(batcher.encode(str(i))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        for task in tasks[1:]:
+            task.cancel()
+        first = await tasks[0]
+        last = await batcher.encode("last")
+        await batcher.stop()
+        return first, last
+
+    assert asyncio.run(run()) == ("0", "last")
+    assert calls == [["0"], ["last"]]
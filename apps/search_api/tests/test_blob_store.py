@@ -0,0 +1,33 @@
+import json
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, VectorParams, Distance
+
+from blob_store import BlobStore, build
+
+
+def seeded_client(titles: list[str]) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection("products", vectors_config={"dense_vector": VectorParams(size=2, distance=Distance.DOT)})
+    client.upsert("products", points=[
+        PointStruct(id=i, vector={"dense_vector": [1.0, 0.0]}, payload={"title": title, "price": str(i)})
+        for i, title in enumerate(titles)
+    ])
+    return client
+
+
+def test_reload_pairs_data_with_its_own_offsets(tmp_path):
+    path = str(tmp_path)
+    build(seeded_client(["ssd", "মাউস"]), "products", path, fields=("title",))
+    store = BlobStore(path)
+    assert json.loads(store.render([1, 0])) == [{"title": "মাউস"}, {"title": "ssd"}]
+
+    # Longer blobs move every offset
+    build(seeded_client(["gaming keyboard", "wireless mouse", "hub"]), "products", path, fields=None)
+    store._loaded_mtime = 0.0
+    assert store.reload()
+    assert json.loads(store.render([0, 2])) == [
+        {"title": "gaming keyboard", "price": "0"},
+        {"title": "hub", "price": "2"},
+    ]
+    assert store.render([5]) is None
@@ -0,0 +1,38 @@
+import asyncio
+
+from cache import SingleFlight
+
+
+def test_flight_survives_one_waiter_leaving():
+    async def run():
+        flight = SingleFlight("test")
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return 42
+
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_flight_is_cancelled_when_last_waiter_leaves():
+    async def run():
+        flight = SingleFlight("test")
+        finished = []
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        waiter = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.1)
+        return finished, flight._inflight
+
+    assert asyncio.run(run()) == ([], {})
@@ -0,0 +1,83 @@
+import os
+import random
+
+import numpy as np
+import pytest
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, trainers
+
+from bm25 import BM25
+from corpus_stats import CorpusStats, update
+from benchmarks.common import SAMPLE_QUERIES, synthetic_title
+
+
+STOPWORDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stopwards")
+
+
+@pytest.fixture(scope="module")
+def documents() -> list[str]:
+    rng = random.Random(7)
+    return SAMPLE_QUERIES + [synthetic_title(rng) for _ in range(300)]
+
+
+@pytest.fixture(scope="module")
+def bm25(tmp_path_factory, documents) -> BM25:
+    # A small BPE tokenizer trained on the fixture corpus; the Hub is not
+    # needed, and the same tokenizer.json code path as production is used
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.normalizer = normalizers.NFKC()
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.train_from_iterator(documents, trainers.BpeTrainer(vocab_size=500, special_tokens=["<unk>"]))
+    path = tmp_path_factory.mktemp("tokenizer")
+    tokenizer.save(str(path / "tokenizer.json"))
+    return BM25(stopwords_dir=STOPWORDS_DIR, languages=["english", "bengali"], tokenizer_path=str(path))
+
+
+def test_add_and_remove_from_empty():
+    stats = CorpusStats()
+    stats.add(np.array([3, 1, 3], dtype=np.int64), np.array([2, 1], dtype=np.int64))
+    assert stats.df.tolist() == [0, 1, 0, 2]
+    assert (stats.doc_count, stats.total_len) == (2, 3)
+
+    # A later batch with new token IDs grows the table
+    stats.add(np.array([6], dtype=np.int64), np.array([1], dtype=np.int64))
+    assert stats.df.tolist() == [0, 1, 0, 2, 0, 0, 1]
+
+    stats.remove(np.array([3, 6], dtype=np.int64), np.array([1, 1], dtype=np.int64))
+    assert stats.df.tolist() == [0, 1, 0, 1, 0, 0, 0]
+    assert (stats.doc_count, stats.total_len) == (1, 2)
+
+
+def test_remove_unknown_documents():
+    stats = CorpusStats()
+    with pytest.raises(ValueError):
+        stats.remove(np.array([2], dtype=np.int64), np.array([1], dtype=np.int64))
+
+
+def test_raw_embed_batch_matches_raw_embed(bm25, documents):
+    stats = CorpusStats()
+    offsets, indices, values = bm25.raw_embed_batch(documents, batch_size=97, stats=stats)
+
+    bm25.avg_len = stats.avg_len
+    for i, expected in enumerate(bm25.raw_embed(documents)):
+        assert indices[offsets[i]:offsets[i + 1]].tolist() == expected["indices"]
+        assert values[offsets[i]:offsets[i + 1]].tolist() == expected["values"]
+
+
+def test_batch_stats_match_incremental_update(bm25, documents, tmp_path):
+    batched = CorpusStats()
+    bm25.raw_embed_batch(documents, batch_size=50, stats=batched)
+
+    incremental = CorpusStats()
+    update(bm25, incremental, added=documents[:100])
+    update(bm25, incremental, added=documents[100:])
+    update(bm25, incremental, added=documents[:10], removed=documents[:10])
+
+    assert incremental.doc_count == batched.doc_count == len(documents)
+    assert incremental.total_len == batched.total_len
+    assert incremental.df.tolist() == batched.df.tolist()
+
+    path = str(tmp_path / "stats.npz")
+    batched.save(path)
+    loaded = CorpusStats.load(path)
+    assert (loaded.doc_count, loaded.total_len) == (batched.doc_count, batched.total_len)
+    assert loaded.df.tolist() == batched.df.tolist()
@@ -0,0 +1,47 @@
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from dense_index import DenseIndex, read_meta, snapshot
+
+
+def seeded_client(count: int) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "products", vectors_config={"dense_vector": VectorParams(size=4, distance=Distance.COSINE)}
+    )
+    rng = np.random.default_rng(0)
+    if count:
+        client.upsert("products", points=[
+            PointStruct(
+                id=i,
+                vector={"dense_vector": rng.random(4).tolist()},
+                payload={"title": f"পণ্য {i}", "specification": {"Warranty": "1 year"}},
+            )
+            for i in range(count)
+        ])
+    return client
+
+
+def test_search_decodes_only_matching_rows(tmp_path):
+    client = seeded_client(50)
+    assert snapshot(client, "products", str(tmp_path)) == 50
+    index = DenseIndex(str(tmp_path))
+    assert len(index) == 50
+    assert index.built_at == read_meta(str(tmp_path))["built_at"]
+
+    query = client.retrieve("products", ids=[7], with_vectors=True)[0].vector["dense_vector"]
+    expected = client.query_points("products", query=query, using="dense_vector", limit=5).points
+    points = index.search(query, 5)
+    assert [point.id for point in points] == [point.id for point in expected]
+    assert points[0].payload == {"title": "পণ্য 7", "specification": {"Warranty": "1 year"}}
+
+    projected = index.search(query, 1, fields=("title",))
+    assert projected[0].payload == {"title": "পণ্য 7"}
+
+
+def test_empty_collection(tmp_path):
+    assert snapshot(seeded_client(0), "products", str(tmp_path)) == 0
+    index = DenseIndex(str(tmp_path))
+    assert len(index) == 0
+    assert index.search([1.0, 0.0, 0.0, 0.0], 5) == []
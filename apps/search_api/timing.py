@@ -0,0 +1,53 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Gauge, Histogram
+
+
+SEARCH_STAGE_LATENCY = Histogram(
+    'search_stage_latency_seconds',
+    'Latency of each search stage in seconds',
+    ['stage', 'query_type'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Stage durations of the request being served, for its Server-Timing
+# header. Tasks spawned by the request inherit the same dict.
+request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def time_stage(stage: str, query_type: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        SEARCH_STAGE_LATENCY.labels(stage=stage, query_type=query_type).observe(elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings.items())
+
+
+STARTUP_SECONDS = Gauge(
+    'startup_component_seconds',
+    'Time spent loading each component at startup',
+    ['component']
+)
+
+
+@contextmanager
+def time_startup(component: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        STARTUP_SECONDS.labels(component=component).set(elapsed)
+        logging.getLogger("uvicorn.error").info(f"Loaded {component} in {elapsed:.2f}s")
@@ -0,0 +1,63 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+
+TITLE_KEY_FIELD = "title_key"
+
+
+def normalize_title(title: str) -> str:
+    # Listings that only differ in case or spacing collapse into one group
+    return " ".join(title.casefold().split())
+
+
+def backfill(client, collection_name: str, field: str = TITLE_KEY_FIELD, batch_size: int = 256) -> int:
+    """Store the normalized title of every point under `field` and index it."""
+    from qdrant_client.models import PayloadSchemaType, SetPayload, SetPayloadOperation
+
+    updated = 0
+    next_page = None
+    while True:
+        points, next_page = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=next_page,
+            with_payload=["title"],
+            with_vectors=False,
+        )
+        operations = [
+            SetPayloadOperation(set_payload=SetPayload(
+                payload={field: normalize_title(point.payload["title"])},
+                points=[point.id],
+            ))
+            for point in points
+            if point.payload.get("title")
+        ]
+        if operations:
+            client.batch_update_points(collection_name=collection_name, update_operations=operations)
+            updated += len(operations)
+
+        if next_page is None:
+            break
+
+    client.create_payload_index(
+        collection_name=collection_name,
+        field_name=field,
+        field_schema=PayloadSchemaType.KEYWORD,
+    )
+    return updated
+
+
+if __name__ == "__main__":
+    from qdrant_client import QdrantClient
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Backfill the normalized title key used for grouping")
+    parser.add_argument("--field", default=os.environ.get("DEDUP_GROUP_KEY", TITLE_KEY_FIELD))
+    args = parser.parse_args()
+
+    client = QdrantClient(url=os.environ.get("QDRANT_URL"), timeout=600)
+    count = backfill(client, os.environ.get("QDRANT_COLLECTION_NAME"), args.field)
+    print(f"Set {args.field} on {count} points")